@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Author: Hunter Baines <0x68@protonmail.com>
+# Copyright: (C) 2017 Hunter Baines
+# License: GNU GPL version 3
+
+"""Compare the Python and NumPy backends on a synthetic history.
+
+Usage: ./bench-backend.py [DAYS] [PATHS_PER_DAY]
+
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import vimtimetap  # noqa: E402
+from benchmark import write_timetap_dir  # noqa: E402
+
+
+def main():
+    day_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    paths_per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    end_date = datetime(year=2017, month=12, day=31)
+    start_date = end_date - timedelta(days=day_count-1)
+
+    with tempfile.TemporaryDirectory() as timetap_dir:
+        write_timetap_dir(timetap_dir, end_date, day_count, paths_per_day, path_depth=4,
+                          full_megabytes=0)
+        print("{} days, {} records".format(day_count, day_count * paths_per_day))
+
+        results = {}
+        for backend in ("python", "numpy"):
+            start = time.perf_counter()
+            results[backend] = vimtimetap.database_views(start_date, end_date=end_date, jobs=1,
+                                                         use_index=False, backend=backend,
+                                                         directory=timetap_dir)
+            elapsed = time.perf_counter() - start
+            print("{:>7}: {:.3f} s".format(backend, elapsed))
+
+        assert results["python"] == results["numpy"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# Author: Hunter Baines <0x68@protonmail.com>
+# Copyright: (C) 2017 Hunter Baines
+# License: GNU GPL version 3
+
+"""Compare peak memory of reading a large full.db whole and as a stream.
+
+Usage: ./bench-memory.py [MEGABYTES]
+
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import vimtimetap  # noqa: E402
+from benchmark import write_timetap_dir  # noqa: E402
+
+
+def populate(timetap_dir, mode):
+    # Aggregate "full.db" by path the given way and print peak RSS
+    time_per_path = {}
+    start = time.perf_counter()
+
+    if mode == "whole":
+        # How `vimtimetap.populate_database_dict` read files before streaming
+        with open(os.path.join(timetap_dir, "full.db"), "r") as database:
+            data = database.read().splitlines()
+        for line in data:
+            path, seconds = vimtimetap._parse_database_line(line)
+            time_per_path[path] = time_per_path.get(path, 0) + seconds
+    else:
+        vimtimetap.populate_database_dict("full.db", time_per_path,
+                                          key_type=vimtimetap.DatabaseDisplayKey.PATH,
+                                          directory=timetap_dir)
+
+    elapsed = time.perf_counter() - start
+    # `ru_maxrss` is in kilobytes on Linux
+    peak_megabytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("{:>7}: {:>8.1f} MB peak RSS, {:.2f} s".format(mode, peak_megabytes, elapsed))
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        populate(sys.argv[2], sys.argv[3])
+        return
+
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with tempfile.TemporaryDirectory() as timetap_dir:
+        # Only the full database, of paths spread over 5000 files
+        write_timetap_dir(timetap_dir, datetime.today(), day_count=0, paths_per_day=500,
+                          path_depth=4, full_megabytes=megabytes)
+        with open(os.path.join(timetap_dir, "full.db"), "r") as database:
+            line_count = sum(1 for _ in database)
+        print("full.db: {} MB, {} lines".format(megabytes, line_count))
+        for mode in ("whole", "stream"):
+            # Separate processes so each peak RSS is measured on its own
+            subprocess.check_call([sys.executable, __file__, "--child", timetap_dir, mode])
+
+
+if __name__ == "__main__":
+    main()
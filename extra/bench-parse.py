@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+# Author: Hunter Baines <0x68@protonmail.com>
+# Copyright: (C) 2017 Hunter Baines
+# License: GNU GPL version 3
+
+"""Compare lines parsed per second by the old and current line parsers.
+
+Usage: ./bench-parse.py [LINE_COUNT]
+
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import vimtimetap  # noqa: E402
+
+
+def legacy_parse_database_line(line):
+    # How lines were parsed before `vimtimetap._parse_database_line`
+    line_dict = json.loads(line.replace("'", '"'))
+    path = list(line_dict).pop()
+    return path, line_dict[path]["total"]
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lines = ["{{'/home/user/project{}/src/file{}.py': {{'total': {}}}}}".format(i % 50, i, i % 5000)
+             for i in range(line_count)]
+
+    for name, parse in (("json", legacy_parse_database_line),
+                        ("scanner", vimtimetap._parse_database_line)):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        elapsed = time.perf_counter() - start
+        print("{:>8}: {:>10.0f} lines/s".format(name, line_count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
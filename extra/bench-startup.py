@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+# Author: Hunter Baines <0x68@protonmail.com>
+# Copyright: (C) 2017 Hunter Baines
+# License: GNU GPL version 3
+
+"""Time the startup of the plain `vim-timetap` run with `-X importtime`.
+
+Exits with status 1 if the run imports any module it shouldn't need, so this
+can guard against regressions.
+
+Usage: ./bench-startup.py [RUNS]
+
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark import write_timetap_dir
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vimtimetap.py")
+
+# Modules only needed by options, the index, or the daemon
+UNNEEDED_MODULES = ("argparse", "concurrent.futures", "csv", "ctypes", "json", "re", "shutil",
+                    "socket", "socketserver", "threading")
+
+
+def imported_modules(args, env):
+    # Return a mapping of each module imported by a run to its cumulative
+    # import time in microseconds
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        # E.g., "import time:       289 |       2363 | json"
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Indentation shows which module imported which
+            modules[name[1:].rstrip()] = int(cumulative)
+    return modules
+
+
+def median_seconds(args, env, runs):
+    # Return the median wall time of running Python with args
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, env=env, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as home:
+        timetap_dir = os.path.join(home, ".timetap")
+        os.mkdir(timetap_dir)
+        # A database for today like one a day's work would leave
+        write_timetap_dir(timetap_dir, datetime.today(), day_count=1, paths_per_day=100,
+                          path_depth=2, full_megabytes=0)
+        env = dict(os.environ, HOME=home)
+
+        # How the launcher made by "install.sh" runs it, from cached bytecode
+        launcher = ("import sys; sys.path.insert(0, {!r}); sys.argv = ['vim-timetap']; "
+                    "from vimtimetap import main; main()".format(os.path.dirname(SCRIPT)))
+        for name, args in (("python", ["-c", "pass"]), ("default", [SCRIPT]),
+                           ("launcher", ["-c", launcher]),
+                           ("--weeks", [SCRIPT, "--weeks", "--no-daemon"])):
+            print("{:>8}: {:6.1f} ms".format(name, 1000 * median_seconds(args, env, runs)))
+
+        modules = imported_modules([SCRIPT], env)
+        # Only modules imported directly by the script have no indentation
+        top_level = sorted(((cumulative, name) for name, cumulative in modules.items()
+                            if not name.startswith(" ")), reverse=True)
+        print("imports: {:6.1f} ms".format(sum(cumulative for cumulative, _ in top_level) / 1000))
+        for cumulative, name in top_level[:5]:
+            print("{:>8}  {:6.1f} ms".format("", cumulative / 1000), name)
+
+        unneeded = [name for name in UNNEEDED_MODULES
+                    if any(module.strip() == name for module in modules)]
+        if unneeded:
+            print("imported but unneeded:", ", ".join(unneeded))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+# Author: Hunter Baines <0x68@protonmail.com>
+# Copyright: (C) 2017 Hunter Baines
+# License: GNU GPL version 3
+
+"""Time each stage of a report on a synthetic TimeTap directory.
+
+A TimeTap directory with date databases and a full database is generated in
+a temporary directory, and the stages of a report (enumerating the date
+databases, parsing them, aggregating records by each `DatabaseDisplayKey`,
+filtering, sorting, and rendering) are timed in turn. So are the paths a
+report actually takes: `database_views` with the rollup index, without it,
+and with the binary cache of the full database, ranking with a bounded heap
+(as `--top` does), and printing each view with `_print_view`. The results,
+with throughput and peak memory for each stage, are printed as JSON so that
+runs against different versions can be compared.
+
+Usage: ./benchmark.py [-h] [--days N] [--paths-per-day N] [--path-depth N]
+                      [--full-megabytes N] [--repeat N] [--regex REGEX]
+                      [--top N]
+
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import vimtimetap  # noqa: E402
+from vimtimetap import DatabaseDisplayKey  # noqa: E402
+
+EXTENSIONS = ("py", "c", "md", "txt", "h", "sh")
+
+
+def synthetic_paths(count, depth):
+    # Return paths spread over projects and directories `depth` levels deep
+    paths = []
+    for i in range(count):
+        directories = ["project{}".format(i % 20)]
+        directories += ["dir{}".format((i // 7**level) % 7) for level in range(depth - 1)]
+        filename = "file{}.{}".format(i, EXTENSIONS[i % len(EXTENSIONS)])
+        paths.append("/home/user/" + "/".join(directories + [filename]))
+    return paths
+
+
+def write_timetap_dir(timetap_dir, end_date, day_count, paths_per_day, path_depth,
+                      full_megabytes):
+    # Write date databases for each of the days up through the end date and
+    # a full database of about the given size, returning the bytes written
+    rng = random.Random(0)
+    paths = synthetic_paths(paths_per_day * 10, path_depth)
+    byte_count = 0
+
+    for day in range(day_count):
+        filename = (end_date - timedelta(days=day)).strftime("%Y%m%d") + ".db"
+        with open(os.path.join(timetap_dir, filename), "w") as database:
+            for path in rng.sample(paths, paths_per_day):
+                database.write(vimtimetap._database_line(path, rng.randint(1, 3600)) + "\n")
+            byte_count += database.tell()
+
+    with open(os.path.join(timetap_dir, "full.db"), "w") as database:
+        while database.tell() < full_megabytes * 1024 * 1024:
+            for path in rng.sample(paths, min(len(paths), 1000)):
+                database.write(vimtimetap._database_line(path, rng.randint(1, 3600)) + "\n")
+        byte_count += database.tell()
+
+    return byte_count
+
+
+def measure(function, repeat):
+    # Return (RESULT, SECONDS, PEAK_BYTES) for the fastest of `repeat` calls
+    # of function and the peak memory it allocates, measured separately
+    # since tracing slows it down
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak_bytes
+
+
+def stage_result(stage, key_type, seconds, peak_bytes, items, byte_count=None):
+    # Return a JSON-ready record of a stage's measurements
+    result = {
+        "stage": stage,
+        "key_type": key_type.name if key_type is not None else None,
+        "seconds": round(seconds, 6),
+        "items": items,
+        "items_per_second": round(items / seconds) if seconds else None,
+        "peak_bytes": peak_bytes,
+    }
+    if byte_count is not None:
+        result["bytes_per_second"] = round(byte_count / seconds) if seconds else None
+    return result
+
+
+def run_stages(timetap_dir, start_date, end_date, repeat, regex, top):
+    # Return a list of the measurements of every stage
+    results = []
+    database_filenames, seconds, peak_bytes = measure(
+        lambda: vimtimetap.existing_database_filenames(start_date, end_date, timetap_dir), repeat)
+    results.append(stage_result("enumerate", None, seconds, peak_bytes,
+                                len(database_filenames)))
+
+    date_bytes = sum(os.path.getsize(os.path.join(timetap_dir, filename))
+                     for filename in database_filenames)
+    record_count, seconds, peak_bytes = measure(
+        lambda: sum(1 for filename in database_filenames
+                    for _ in vimtimetap.database_records(filename, timetap_dir)), repeat)
+    results.append(stage_result("parse", None, seconds, peak_bytes, record_count, date_bytes))
+
+    full_bytes = os.path.getsize(os.path.join(timetap_dir, "full.db"))
+    full_record_count, seconds, peak_bytes = measure(
+        lambda: sum(1 for _ in vimtimetap.database_records("full.db", timetap_dir)), repeat)
+    results.append(stage_result("parse_full", None, seconds, peak_bytes, full_record_count,
+                                full_bytes))
+
+    for key_type in DatabaseDisplayKey:
+        def aggregate():
+            database_dict = {}
+            for filename in database_filenames:
+                vimtimetap.populate_database_dict(filename, database_dict, key_type=key_type,
+                                                  directory=timetap_dir)
+            return database_dict
+        database_dict, seconds, peak_bytes = measure(aggregate, repeat)
+        results.append(stage_result("aggregate", key_type, seconds, peak_bytes, record_count,
+                                    date_bytes))
+
+        def filter_copy():
+            # Filtering is in place, so each call filters a fresh copy
+            filtered_dict = dict(database_dict)
+            vimtimetap.filter_database_dict(filtered_dict, regex)
+            return filtered_dict
+        filtered_dict, seconds, peak_bytes = measure(filter_copy, repeat)
+        results.append(stage_result("filter", key_type, seconds, peak_bytes,
+                                    len(database_dict)))
+
+        tree = key_type == DatabaseDisplayKey.TREE
+        if key_type == DatabaseDisplayKey.DATE or tree:
+            # Dates are already in order, and the tree is sorted as it's
+            # rendered
+            database = list(filtered_dict.items())
+        else:
+            database, seconds, peak_bytes = measure(
+                lambda: sorted(filtered_dict.items(), key=lambda tup: tup[1], reverse=True),
+                repeat)
+            results.append(stage_result("sort", key_type, seconds, peak_bytes, len(database)))
+
+        def render():
+            with redirect_stdout(io.StringIO()) as output:
+                vimtimetap.print_database(database, start_date, end_date=end_date, tree=tree)
+            return output.getvalue().count("\n")
+        line_count, seconds, peak_bytes = measure(render, repeat)
+        results.append(stage_result("render", key_type, seconds, peak_bytes, line_count))
+
+        if not (key_type == DatabaseDisplayKey.DATE or tree):
+            _, seconds, peak_bytes = measure(
+                lambda: vimtimetap.ranked_database_items(filtered_dict, top=top), repeat)
+            results.append(stage_result("rank_top", key_type, seconds, peak_bytes,
+                                        len(filtered_dict)))
+
+        def print_view():
+            # `_print_view` filters in place, so each call prints a fresh copy
+            with redirect_stdout(io.StringIO()) as output:
+                vimtimetap._print_view(dict(database_dict), key_type, start_date, end_date,
+                                       regex=regex, top=top)
+            return output.getvalue().count("\n")
+        line_count, seconds, peak_bytes = measure(print_view, repeat)
+        results.append(stage_result("print_view", key_type, seconds, peak_bytes, line_count))
+
+    results += run_view_stages(timetap_dir, start_date, end_date, repeat, record_count,
+                               date_bytes, full_record_count, full_bytes)
+    return results
+
+
+def run_view_stages(timetap_dir, start_date, end_date, repeat, record_count, date_bytes,
+                    full_record_count, full_bytes):
+    # Return a list of the measurements of `database_views` of every key
+    # type, reading the data each of the ways a report can
+    results = []
+    key_types = list(DatabaseDisplayKey)
+    index_dir = os.path.join(timetap_dir, ".index")
+
+    def build_index():
+        shutil.rmtree(index_dir, ignore_errors=True)
+        return vimtimetap.update_index(jobs=1, directory=timetap_dir)
+    _, seconds, peak_bytes = measure(build_index, repeat)
+    results.append(stage_result("index_build", None, seconds, peak_bytes, record_count,
+                                date_bytes))
+
+    for stage, view_start_date, use_index, items, byte_count in (
+            ("views_index", start_date, True, record_count, date_bytes),
+            ("views_no_index", start_date, False, record_count, date_bytes),
+            ("views_binary_cache", None, True, full_record_count, full_bytes),
+            ("views_full_no_cache", None, False, full_record_count, full_bytes)):
+        # The first call builds the index or binary cache if needed, and
+        # the fastest of the calls is the one kept
+        _, seconds, peak_bytes = measure(
+            lambda: vimtimetap.database_views(view_start_date, end_date=end_date,
+                                              key_types=key_types, jobs=1, use_index=use_index,
+                                              directory=timetap_dir),
+            repeat)
+        results.append(stage_result(stage, None, seconds, peak_bytes, items, byte_count))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--days", metavar="N", type=int, default=3650,
+                        help="number of date databases (default: 3650)")
+    parser.add_argument("--paths-per-day", metavar="N", type=int, default=50,
+                        help="number of paths in each date database (default: 50)")
+    parser.add_argument("--path-depth", metavar="N", type=int, default=4,
+                        help="number of directories below the home directory in each path "
+                             "(default: 4)")
+    parser.add_argument("--full-megabytes", metavar="N", type=float, default=20,
+                        help="approximate size of the full database (default: 20)")
+    parser.add_argument("--repeat", metavar="N", type=int, default=3,
+                        help="number of times each stage is timed, keeping the fastest "
+                             "(default: 3)")
+    parser.add_argument("--regex", default=r".*[0-4].*",
+                        help="regex used in the filter stage (default: '.*[0-4].*')")
+    parser.add_argument("--top", metavar="N", type=int, default=20,
+                        help="number of entries ranked in the rank_top and print_view stages "
+                             "(default: 20)")
+    args = parser.parse_args()
+
+    end_date = datetime(year=2017, month=12, day=31)
+    start_date = end_date - timedelta(days=args.days-1)
+
+    with tempfile.TemporaryDirectory() as timetap_dir:
+        start = time.perf_counter()
+        byte_count = write_timetap_dir(timetap_dir, end_date, args.days, args.paths_per_day,
+                                       args.path_depth, args.full_megabytes)
+        generate_seconds = time.perf_counter() - start
+        stages = run_stages(timetap_dir, start_date, end_date, args.repeat, args.regex,
+                            args.top)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "generated": {"bytes": byte_count, "seconds": round(generate_seconds, 6)},
+        "stages": stages,
+        # `ru_maxrss` is in kilobytes on Linux
+        "max_rss_kilobytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
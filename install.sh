@@ -58,16 +58,42 @@ while true; do
     echo
 done
 
-# Install the program in the user-selected path
+# Install the program in the user-selected path. The executable is just a
+# launcher for the module installed beside it, since Python caches the
+# bytecode of a module but compiles a script anew every run (which would
+# take up most of the time a plain `vim-timetap` takes)
 source_name="vimtimetap.py"
 executable_name="vim-timetap"
 if [[ -n $chosen_path ]]; then
-    cp "$source_name" "$executable_name"
+    cat > "$executable_name" << 'LAUNCHER'
+#!/usr/bin/env python3
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from vimtimetap import main  # noqa: E402
+
+main()
+LAUNCHER
     chmod +x "$executable_name"
+    failed_commands=()
     if ! mv -vi "$executable_name" "$chosen_path"; then
-        # mv failed, most likely due to permission problem
+        failed_commands+=("sudo mv -vi \"$executable_name\" \"$chosen_path\"")
+    fi
+    if cp -vi "$source_name" "$chosen_path"; then
+        # Compile the module now so that even the first run is quick
+        python3 -m py_compile "$chosen_path/$source_name"
+    else
+        failed_commands+=("sudo cp -vi \"$source_name\" \"$chosen_path\"")
+        failed_commands+=("sudo python3 -m py_compile \"$chosen_path/$source_name\"")
+    fi
+
+    if [[ ${#failed_commands[@]} -gt 0 ]]; then
+        # mv or cp failed, most likely due to permission problem
         (>&2 echo)
-        (>&2 echo "To complete install, consider running this command:")
-        (>&2 echo "sudo mv -vi \"$executable_name\" \"$chosen_path\"")
+        (>&2 echo "To complete install, consider running these commands:")
+        for command in "${failed_commands[@]}"; do
+            (>&2 echo "$command")
+        done
     fi
 fi
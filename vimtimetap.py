@@ -10,12 +10,22 @@ Gather, filter, and summarize time data saved by the Vim time-tracking
 plugin by Rainer Borene, vim-timetap: github.com/rainerborene/vim-timetap.
 
 """
-import argparse
-import json
+# Most modules are imported where they're used rather than here, since the
+# plain `vim-timetap` run (e.g., by a status line every few seconds) needs
+# few of them and importing the rest would take longer than the run itself
+import io
+import mmap
 import os
-import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from enum import IntEnum, auto
+from functools import lru_cache
+from itertools import repeat
 
 
 class DatabaseDisplayKey(IntEnum):
@@ -26,41 +36,826 @@ class DatabaseDisplayKey(IntEnum):
     FILETYPE = auto()
 
 
+class DaemonRequestHandler(object):
+    # A `socketserver` request handler, which doesn't subclass
+    # `socketserver.StreamRequestHandler` only so that clients of the daemon
+    # needn't import `socketserver`
+
+    def __init__(self, request, client_address, server):
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        self.handle()
+
+    def handle(self):
+        # Answer a query of the form '["--weeks", "--names"]\n' with a
+        # response of the form '{"status": 0, "stdout": "...", "stderr": ""}'
+        import json
+
+        with self.request.makefile("rb") as rfile:
+            request = rfile.readline()
+        if not request:
+            # Just a check for whether the daemon is running
+            return
+        argv = json.loads(request.decode())
+        response = dict(zip(("status", "stdout", "stderr"), _run_captured(argv)))
+        self.request.sendall(json.dumps(response).encode())
+
+
+class DatabaseWatcher(object):
+    """Watch a TimeTap directory for database files that change.
+
+    A background thread notes each database file (YYYYMMDD.db or full.db)
+    that is created, modified, or deleted, using inotify where available
+    and otherwise comparing modification times and sizes every
+    `poll_interval` seconds.
+
+    Parameters
+    ----------
+    directory : str, optional
+        The directory to watch (default `TIMETAP_DIR`).
+    poll_interval : float, optional
+        The number of seconds between checks when polling (default 1.0).
+
+    Attributes
+    ----------
+    backend : str
+        Either "inotify" or "poll", depending on how changes are detected.
+
+    """
+
+    def __init__(self, directory=None, poll_interval=1.0):
+        import threading
+
+        self.directory = TIMETAP_DIR if directory is None else directory
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._overflowed = False
+        self._latencies = []
+        self._stopped = threading.Event()
+
+        try:
+            self._inotify_fd = _inotify_watch(self.directory)
+            self.backend = "inotify"
+            target = self._watch_inotify
+        except OSError:
+            self._stamps = self._current_stamps()
+            self.backend = "poll"
+            target = self._watch_poll
+
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def changes(self):
+        """Return the names of the files that changed since the last call.
+
+        Returns
+        -------
+        set of str or None
+            The names of the changed files in the watched directory or None
+            if too many changes happened to keep track of, in which case any
+            file may have changed.
+
+        """
+        with self._lock:
+            changed = None if self._overflowed else self._changed
+            self._changed = set()
+            self._overflowed = False
+        return changed
+
+    def metrics(self):
+        """Return statistics on how quickly changes have been noticed.
+
+        Returns
+        -------
+        dict
+            A mapping with the items "backend", "changes" (the number of
+            changes noticed to files that still existed), and
+            "latency_last", "latency_mean", and "latency_max" (the seconds
+            between a file's modification time and its change being
+            noticed, or None if no changes have been noticed).
+
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+        metrics = {"backend": self.backend, "changes": len(latencies),
+                   "latency_last": None, "latency_mean": None, "latency_max": None}
+        if latencies:
+            metrics["latency_last"] = latencies[-1]
+            metrics["latency_mean"] = sum(latencies) / len(latencies)
+            metrics["latency_max"] = max(latencies)
+        return metrics
+
+    def stop(self):
+        """Stop watching the directory.
+
+        """
+        self._stopped.set()
+        self._thread.join()
+        if self.backend == "inotify":
+            os.close(self._inotify_fd)
+
+    def _note_changes(self, filenames):
+        # Record changed files along with how long it took to notice them
+        now = time.time()
+        latencies = []
+        for filename in filenames:
+            try:
+                mtime = os.stat(os.path.join(self.directory, filename)).st_mtime
+            except OSError:
+                continue
+            latencies.append(max(0.0, now - mtime))
+
+        with self._lock:
+            self._changed.update(filenames)
+            self._latencies.extend(latencies)
+            # Keep the statistics to recent changes
+            del self._latencies[:-1000]
+
+    def _watch_inotify(self):
+        # Read inotify events until stopped
+        import select
+
+        while not self._stopped.is_set():
+            readable, _, _ = select.select([self._inotify_fd], [], [], 0.5)
+            if not readable:
+                continue
+            data = os.read(self._inotify_fd, 65536)
+
+            filenames = set()
+            offset = 0
+            while offset < len(data):
+                _, mask, _, name_len = struct.unpack_from("iIII", data, offset)
+                offset += struct.calcsize("iIII")
+                name = os.fsdecode(data[offset:offset+name_len].rstrip(b"\0"))
+                offset += name_len
+                if mask & _IN_Q_OVERFLOW:
+                    with self._lock:
+                        self._overflowed = True
+                elif _is_database_filename(name):
+                    filenames.add(name)
+            if filenames:
+                self._note_changes(filenames)
+
+    def _watch_poll(self):
+        # Compare modification times and sizes until stopped
+        while not self._stopped.wait(self.poll_interval):
+            stamps = self._current_stamps()
+            filenames = {filename for filename in set(stamps) | set(self._stamps)
+                         if stamps.get(filename) != self._stamps.get(filename)}
+            self._stamps = stamps
+            if filenames:
+                self._note_changes(filenames)
+
+    def _current_stamps(self):
+        # Return a mapping of database filenames to (MTIME_NS, SIZE)
+        stamps = {}
+        for filename in os.listdir(self.directory):
+            if _is_database_filename(filename):
+                try:
+                    stat = os.stat(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    continue
+                stamps[filename] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+
+class PathFilter(object):
+    """Decide which paths to include based on regular expressions.
+
+    A path is accepted if it matches (from its start) any of the `include`
+    regexes, or if there are none, and matches none of the `exclude`
+    regexes. Each decision is remembered, so no distinct path is tested
+    against the regexes more than once.
+
+    Parameters
+    ----------
+    include : list of str, optional
+        Regexes at least one of which each accepted path must match
+        (default None, meaning every path may be accepted).
+    exclude : list of str, optional
+        Regexes none of which an accepted path may match (default None).
+
+    Raises
+    ------
+    re.error
+        If any of the regexes is invalid.
+
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = [_compiled_regex(regex) for regex in include or []]
+        self.exclude = [_compiled_regex(regex) for regex in exclude or []]
+        self._accepted = {}
+
+    def __call__(self, path):
+        try:
+            return self._accepted[path]
+        except KeyError:
+            pass
+
+        accepted = (not self.include or any(regex.match(path) for regex in self.include)) \
+            and not any(regex.match(path) for regex in self.exclude)
+        self._accepted[path] = accepted
+        return accepted
+
+
+class TimeTapDatabase(object):
+    """A TimeTap directory to query from a long-running program.
+
+    Unlike the module-level functions, which read whatever databases a
+    range covers each time, this keeps the records of each database it
+    reads, summed per path, in a least-recently-used cache bounded by an
+    estimate of the memory they take up. A database is only read again
+    once its modification time or size changes, which in practice only
+    happens to today's, so repeated queries read next to nothing.
+
+    Only the databases in `directory` are read; it need not be
+    `TIMETAP_DIR`, and the rollup index and binary caches are not used. The
+    methods may be called from several threads at once.
+
+    Parameters
+    ----------
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
+    max_bytes : int, optional
+        The most memory, as estimated with `sys.getsizeof`, that the cached
+        records may take up before the least recently used are dropped
+        (default `DATABASE_CACHE_BYTES`).
+
+    Examples
+    --------
+    >>> import vimtimetap
+    >>> database = vimtimetap.TimeTapDatabase()
+    >>> ranked = database.ranked(vimtimetap.DatabaseDisplayKey.PATH, None, top=10)
+
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        import threading
+        from collections import OrderedDict
+
+        self.directory = TIMETAP_DIR if directory is None else directory
+        self.max_bytes = DATABASE_CACHE_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        # A mapping of filenames to ((MTIME_NS, SIZE), TIME_PER_PATH, BYTES)
+        # from least to most recently used
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def views(self, start_date, end_date=None, key_types=None, path_filter=None):
+        """Return a database dictionary for each of several key types.
+
+        The parameters and return value are as for `database_views`.
+
+        """
+        database_filenames = self.database_filenames(start_date, end_date)
+        return _summed_database_views(database_filenames,
+                                      map(self.time_per_path, database_filenames),
+                                      key_types=key_types, path_filter=path_filter)
+
+    def view(self, key_type, start_date, end_date=None, path_filter=None, regex=None):
+        """Return a database dictionary for one key type.
+
+        This is what the commandline prints for the given view (before
+        sorting), with `regex` used as `--filter` is.
+
+        Parameters
+        ----------
+        key_type : DatabaseDisplayKey constant
+            How keys are formed from paths.
+        regex : str, optional
+            If given, only keys it matches are included, as with
+            `filter_database_dict`, unless `key_type` is
+            DatabaseDisplayKey.DATE (default None).
+
+        The other parameters are as for `database_views`.
+
+        Returns
+        -------
+        dict of str to int
+            A new mapping of names to the number of seconds associated with
+            each name.
+
+        """
+        database_dict = self.views(start_date, end_date=end_date, key_types=[key_type],
+                                   path_filter=path_filter)[key_type]
+        if regex is not None and key_type != DatabaseDisplayKey.DATE:
+            filter_database_dict(database_dict, regex)
+        return database_dict
+
+    def ranked(self, key_type, start_date, end_date=None, path_filter=None, regex=None,
+               top=None, min_seconds=None):
+        """Return the items of a view from most to least time.
+
+        The parameters are as for `view` and `ranked_database_items`, and
+        the return value is as for `ranked_database_items`.
+
+        """
+        return ranked_database_items(self.view(key_type, start_date, end_date=end_date,
+                                               path_filter=path_filter, regex=regex),
+                                     top=top, min_seconds=min_seconds)
+
+    def database_filenames(self, start_date, end_date=None):
+        """Return sorted filenames of existing databases in the given range.
+
+        This is as `existing_database_filenames` is, but for `directory`.
+
+        """
+        return existing_database_filenames(start_date, end_date, self.directory)
+
+    def time_per_path(self, database_filename):
+        """Return the seconds per path in a database, reading it if needed.
+
+        Parameters
+        ----------
+        database_filename : str
+            The name of a file in `directory`.
+
+        Returns
+        -------
+        dict of str to int
+            A mapping of paths to the seconds recorded for each, which is
+            shared with the cache and should not be modified; it is empty if
+            the file doesn't exist.
+
+        """
+        filename = os.path.join(self.directory, database_filename)
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            with self._lock:
+                self._evict(database_filename)
+            return {}
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._cache.get(database_filename)
+            if entry is not None and entry[0] == stamp:
+                self._cache.move_to_end(database_filename)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        # Read without holding the lock, so other threads can use the cache
+        # meanwhile; `database_records` takes an absolute path as well
+        time_per_path = {}
+        for path, seconds in database_records(filename):
+            try:
+                time_per_path[path] += seconds
+            except KeyError:
+                time_per_path[path] = seconds
+        entry_bytes = sys.getsizeof(time_per_path) + sum(
+            sys.getsizeof(path) + sys.getsizeof(seconds)
+            for path, seconds in time_per_path.items())
+
+        with self._lock:
+            self._evict(database_filename)
+            if entry_bytes <= self.max_bytes:
+                self._cache[database_filename] = (stamp, time_per_path, entry_bytes)
+                self._cache_bytes += entry_bytes
+                while self._cache_bytes > self.max_bytes:
+                    self._evict(next(iter(self._cache)))
+        return time_per_path
+
+    def cache_info(self):
+        """Return statistics on the cache.
+
+        Returns
+        -------
+        dict
+            A mapping with the items "hits" and "misses" (the number of
+            databases found in the cache and read, respectively), "files"
+            (the number now cached), "bytes" (the estimated memory they take
+            up), and "max_bytes".
+
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "files": len(self._cache),
+                    "bytes": self._cache_bytes, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """Drop every cached database."""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def _evict(self, database_filename):
+        # Drop a database from the cache, if it's there; the lock must be held
+        entry = self._cache.pop(database_filename, None)
+        if entry is not None:
+            self._cache_bytes -= entry[2]
+
+
+class AsyncTimeTapDatabase(object):
+    """A `TimeTapDatabase` to query from asyncio code.
+
+    Each query lists the databases in its range and then reads them (or
+    finds them in the cache) in a bounded pool of threads, split into one
+    batch per thread, so the event loop never waits on a file and any
+    number of concurrent queries share the same threads. Queries for the
+    same range and views that arrive while one is already being answered
+    wait for its answer rather than computing it again.
+
+    Parameters
+    ----------
+    directory : str, optional
+        As for `TimeTapDatabase`.
+    max_bytes : int, optional
+        As for `TimeTapDatabase`.
+    max_workers : int, optional
+        The number of threads in the pool (default the CPU count plus 4, up
+        to 32, as for `concurrent.futures.ThreadPoolExecutor`).
+
+    Attributes
+    ----------
+    database : TimeTapDatabase instance
+        The database queried in the pool, whose cache is shared by every
+        query.
+    max_workers : int
+        The number of threads in the pool.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> import vimtimetap
+    >>> async def report():
+    ...     async with vimtimetap.AsyncTimeTapDatabase() as database:
+    ...         return await database.ranked(vimtimetap.DatabaseDisplayKey.PATH, None, top=10)
+    >>> ranked = asyncio.run(report())
+
+    """
+
+    def __init__(self, directory=None, max_bytes=None, max_workers=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.database = TimeTapDatabase(directory=directory, max_bytes=max_bytes)
+        self.max_workers = (min(32, (os.cpu_count() or 1) + 4) if max_workers is None
+                            else max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="timetap")
+        # A mapping of the arguments of each query being answered to the
+        # future of its answer
+        self._in_flight = {}
+
+    async def views(self, start_date, end_date=None, key_types=None, path_filter=None):
+        """Return a database dictionary for each of several key types.
+
+        The parameters and return value are as for `database_views`.
+
+        """
+        views = await self._coalesced_views(start_date, end_date, key_types, path_filter)
+        # Each caller gets its own copy of the shared answer
+        return {key_type: dict(database_dict) for key_type, database_dict in views.items()}
+
+    async def view(self, key_type, start_date, end_date=None, path_filter=None, regex=None):
+        """Return a database dictionary for one key type.
+
+        The parameters and return value are as for `TimeTapDatabase.view`.
+
+        """
+        views = await self._coalesced_views(start_date, end_date, [key_type], path_filter)
+        database_dict = dict(views[key_type])
+        if regex is not None and key_type != DatabaseDisplayKey.DATE:
+            filter_database_dict(database_dict, regex)
+        return database_dict
+
+    async def ranked(self, key_type, start_date, end_date=None, path_filter=None, regex=None,
+                     top=None, min_seconds=None):
+        """Return the items of a view from most to least time.
+
+        The parameters and return value are as for `TimeTapDatabase.ranked`.
+
+        """
+        return ranked_database_items(await self.view(key_type, start_date, end_date=end_date,
+                                                     path_filter=path_filter, regex=regex),
+                                     top=top, min_seconds=min_seconds)
+
+    def close(self):
+        """Stop the pool of threads once any queries it's answering finish."""
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def _coalesced_views(self, start_date, end_date, key_types, path_filter):
+        # Return an awaitable of the views, sharing the answer of any
+        # identical query in flight
+        import asyncio
+
+        end_date = datetime.today() if end_date is None else end_date
+        key_types = tuple(DatabaseDisplayKey) if key_types is None else tuple(key_types)
+        # `PathFilter` instances compare by identity
+        query = (None if start_date is None else start_date.toordinal(), end_date.toordinal(),
+                 key_types, path_filter)
+
+        future = self._in_flight.get(query)
+        if future is None:
+            future = asyncio.ensure_future(self._views(start_date, end_date, key_types,
+                                                       path_filter))
+            self._in_flight[query] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(query, None))
+        # One caller being cancelled mustn't cancel the others' answer
+        return asyncio.shield(future)
+
+    async def _views(self, start_date, end_date, key_types, path_filter):
+        # Compute the views, reading the databases in batches in the pool
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        database_filenames = await loop.run_in_executor(
+            self._executor, self.database.database_filenames, start_date, end_date)
+        batch_size = max(1, -(-len(database_filenames) // self.max_workers))
+        batches = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._time_per_paths,
+                                 database_filenames[i:i+batch_size])
+            for i in range(0, len(database_filenames), batch_size)))
+        file_dicts = [file_dict for batch in batches for file_dict in batch]
+        return await loop.run_in_executor(self._executor, _summed_database_views,
+                                          database_filenames, file_dicts, list(key_types),
+                                          path_filter)
+
+    def _time_per_paths(self, database_filenames):
+        # Return `TimeTapDatabase.time_per_path` for each of the databases
+        return [self.database.time_per_path(filename) for filename in database_filenames]
+
+
+class RunProfile(object):
+    """Measurements of each stage of a run, for finding what makes it slow.
+
+    While a profile is active (see `profiled`), reading databases and the
+    index adds to its counters, and each stage timed with `stage` is recorded
+    with how much each counter grew during it.
+
+    Parameters
+    ----------
+    start_time : float, optional
+        The `time.perf_counter()` value the run started at, if before now
+        (default now).
+
+    Attributes
+    ----------
+    stages : list of dict
+        A dict for each stage in the order they finished, with the items
+        "name", "seconds", "max_rss_kilobytes" (the peak memory use of the
+        process so far), and any counters that grew, along with any items
+        added while the stage ran.
+    counters : dict of str to int
+        The number of "files_opened", "files_missing", "lines_parsed",
+        "bytes_read", "index_files_read", and "binary_caches_read" so far.
+        Databases read by worker processes are not counted.
+
+    """
+
+    def __init__(self, start_time=None):
+        self.stages = []
+        self.counters = dict.fromkeys(("files_opened", "files_missing", "lines_parsed",
+                                       "bytes_read", "index_files_read",
+                                       "binary_caches_read"), 0)
+        self._start_time = time.perf_counter() if start_time is None else start_time
+
+    def count(self, counter, amount=1):
+        """Add the given amount to one of the counters."""
+        self.counters[counter] += amount
+
+    @contextmanager
+    def stage(self, name):
+        """Return a context manager that records a stage of the given name.
+
+        The context manager yields the dict that will be added to `stages`,
+        so that other items (e.g., the number of unique keys) can be added.
+
+        """
+        counters = dict(self.counters)
+        stage = {"name": name}
+        start_time = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            for counter, value in self.counters.items():
+                if value != counters[counter]:
+                    stage[counter] = value - counters[counter]
+            self.record(name, time.perf_counter() - start_time, stage)
+
+    def record(self, name, seconds, stage=None):
+        """Add a stage that has already been timed to `stages`."""
+        import resource
+
+        stage = {"name": name} if stage is None else stage
+        stage["seconds"] = seconds
+        # `ru_maxrss` is in kilobytes on Linux
+        stage["max_rss_kilobytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stages.append(stage)
+
+    def report(self):
+        """Return the stages and counters as a JSON-serializable dict."""
+        return {"seconds": time.perf_counter() - self._start_time, "stages": self.stages,
+                "counters": self.counters}
+
+
 class TrieNode(object):
+    # A leaf (a file) has no `goto` mapping, which saves a dict per file
+    __slots__ = ("value", "goto")
 
-    def __init__(self, value):
+    def __init__(self, value, goto=None):
         self.value = value
-        self.goto = {}
-
+        self.goto = goto
+
+
+# The names `--views` accepts, which match the options for each view
+VIEW_NAMES = {
+    "dates": DatabaseDisplayKey.DATE,
+    "names": DatabaseDisplayKey.FILENAME,
+    "paths": DatabaseDisplayKey.PATH,
+    "tree": DatabaseDisplayKey.TREE,
+    "types": DatabaseDisplayKey.FILETYPE,
+}
+# What `--format` accepts; only "text" and "json" apply to `--check`, etc.
+OUTPUT_FORMATS = ("text", "json", "jsonl", "csv", "prometheus")
+# What `--series` accepts
+SERIES_BUCKETS = ("day", "week", "month", "quarter")
+# What `--period` accepts: calendar periods, where weeks start on Monday
+CALENDAR_PERIODS = ("week", "month", "quarter", "year")
+# How many keys `--series` displays if `--top` isn't given
+SERIES_DEFAULT_TOP = 10
 
 TIMETAP_DIR = os.path.expanduser("~/.timetap")
+INDEX_DIR = os.path.join(TIMETAP_DIR, ".index")
+# Bumping this forces the index to be rebuilt from scratch
+INDEX_VERSION = 1
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 180
+
+DAEMON_SOCKET = os.path.join(TIMETAP_DIR, ".daemon.sock")
+# How long a client waits on the daemon before computing results itself
+DAEMON_TIMEOUT = 30
+
+BINARY_CACHE_DIR = os.path.join(INDEX_DIR, "binary")
+# Bumping this forces every binary cache to be rewritten
+BINARY_CACHE_VERSION = 1
+# How much memory (roughly) `TimeTapDatabase` keeps parsed databases in
+DATABASE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Magic, version, database MTIME_NS and SIZE, path count, and record count
+_BINARY_CACHE_HEADER = struct.Struct("<4sIqqQQ")
+# What separates the path from the time in a line of a TimeTap database
+_DATABASE_LINE_SEPARATOR = "': {'total': "
+
+# The last listing by `date_database_filenames` as a tuple of the form
+# ((TIMETAP_DIR, MTIME_NS), FILENAMES)
+_date_database_listings = {}
+# Set by `serve` to a mapping of (FILENAME, KEY_TYPE) to ((MTIME_NS, SIZE),
+# DATABASE_DICT) for the files read so far
+_database_cache = None
+# The daemon's parser as a tuple of the form (DATE_CREATED, PARSER)
+_daemon_parser = None
+# Set by `serve` to a `DatabaseWatcher` whose changes invalidate the cache
+_database_watcher = None
+# Set by `profiled` to the active `RunProfile`
+_run_profile = None
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
 
 
 def main():
     """Print summaries of the data collected by Vim TimeTap.
 
     """
+    start_time = time.perf_counter()
+    if len(sys.argv) == 1:
+        # By far the most frequent run (e.g., by a status line), so the
+        # parser isn't even built
+        _exit_with_daemon_output([])
+        _print_today()
+        return
+
     parser = _get_parser()
     args = parser.parse_args()
 
+    if args.serve:
+        serve()
+        return
+
+    # The daemon only caches the databases in `TIMETAP_DIR` (and profiling
+    # it wouldn't say much about this run)
+    profiling = args.profile or args.cprofile is not None
+    if not args.no_daemon and not args.source and not profiling:
+        _exit_with_daemon_output(sys.argv[1:])
+
+    if not profiling:
+        _run(parser, args)
+        return
+
+    import cProfile
+
+    code_profile = cProfile.Profile() if args.cprofile is not None else None
+    with profiled(start_time=start_time) as run_profile:
+        run_profile.record("parse_args", time.perf_counter() - start_time)
+        try:
+            if code_profile is not None:
+                code_profile.runcall(_run, parser, args)
+            else:
+                _run(parser, args)
+        finally:
+            if code_profile is not None:
+                code_profile.dump_stats(args.cprofile)
+            if args.profile:
+                _print_profile_report(run_profile.report(), report_format=args.profile_format)
+
+
+def _exit_with_daemon_output(argv):
+    # Print what the daemon outputs for argv and exit with its status, or
+    # simply return if no daemon is running (or it failed)
+    try:
+        status, stdout, stderr = query_daemon(argv)
+    except (OSError, ValueError):
+        return
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    sys.exit(status)
+
+
+def _print_today():
+    # Print what `_run` does for the default arguments: today's file types
+    now = datetime.today()
+    today = datetime(year=now.year, month=now.month, day=now.day)
+    key_type = DatabaseDisplayKey.FILETYPE
+    views = database_views(today, end_date=today, key_types=[key_type])
+    _print_view(views[key_type], key_type, today, today)
+
+
+def _run(parser, args):
+    # Act on the parsed commandline arguments
+    import glob
+    import json
+    import re
+
+    if args.daemon_status:
+        if _database_watcher is None:
+            parser.error("argument --daemon-status: no daemon is running")
+        print(json.dumps(_database_watcher.metrics(), indent=2))
+        return
+
+    if args.source and (args.check or args.repair or args.compact or args.series
+                        or args.compare):
+        parser.error("argument --source: not allowed with --check, --repair, --compact, "
+                     "--series, or --compare")
+    if args.by_source and not args.source:
+        parser.error("argument --by-source: only allowed with --source")
+
+    if (args.check or args.repair or args.compact) and args.format not in ("text", "json"):
+        parser.error("argument --format: --check, --repair, and --compact reports are text "
+                     "or json")
+
     if args.check:
-        check_database()
+        check_database(jobs=args.jobs, report_format=args.format)
+        return
+
+    if args.repair or args.compact:
+        report = repair_database(rebuild_full=args.repair, compact_dates=args.compact,
+                                 jobs=args.jobs)
+        _print_repair_report(report, report_format=args.format)
         return
 
     # It's not worth throwing an error if negative: just fix it
     args.units_past = abs(args.units_past)
 
-    try:
-        end_date = datetime(year=args.end_year, month=args.end_month, day=args.end_day)
-    except ValueError as err:
-        # An invalid end date
-        parser.error(str(err).lower())
+    if args.to_date is not None:
+        end_date = args.to_date
+    else:
+        try:
+            end_date = datetime(year=args.end_year, month=args.end_month, day=args.end_day)
+        except ValueError as err:
+            # An invalid end date
+            parser.error(str(err).lower())
 
     # Each arg returns the number of days in its unit or 0 (and only one
     # can be nonzero)
     unit_size = max(1, args.years + args.months + args.weeks)
     if args.all or args.units_past == 0:
+        if args.from_date is not None or args.period is not None or args.compare:
+            if args.all:
+                parser.error("argument -a/--all: not allowed with --from, --period, or "
+                             "--compare")
+            # UNITS of 0 means all time, just as `--all` does
+            parser.error("argument UNITS: 0 (all time) not allowed with --from, --period, or "
+                         "--compare")
         start_date = None
+    elif args.from_date is not None:
+        start_date = args.from_date
     else:
         start_date = end_date - timedelta(days=(unit_size*args.units_past-1))
 
@@ -71,31 +866,175 @@ def main():
         if end_date < start_date:
             start_date = end_date
 
+    if args.period is not None:
+        if args.years or args.months or args.weeks:
+            parser.error("argument --period: not allowed with argument -y/--years, "
+                         "-m/--months, or -w/--weeks")
+        if args.from_date is None:
+            # The period containing the end date and the UNITS-1 before it
+            start_date = _period_start(end_date, args.period, offset=1-args.units_past)
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("argument -j/--jobs: must be at least 1")
+
     if start_date and end_date < start_date:
         error_msg = "end date (" + end_date.strftime("%Y %b %d") + ") precedes "
         error_msg += " start date (" + start_date.strftime("%Y %b %d") + ")"
         parser.error(error_msg)
 
-    key_type = _parse_database_display_key(args)
+    windows = None
+    if args.compare:
+        if args.series is not None or args.backend != "python":
+            parser.error("argument --compare: not allowed with --series or --backend numpy")
+        if args.period is not None:
+            windows = period_windows(start_date, end_date, args.period)
+        else:
+            # Consecutive windows of one unit each, starting from the start
+            windows = [(window_start, min(end_date, window_start + timedelta(days=unit_size-1)))
+                       for window_start in map(datetime.fromordinal, range(
+                           start_date.toordinal(), end_date.toordinal() + 1, unit_size))]
 
-    time_per_type = {}
-    database = []
-    for database_filename in generated_database_filenames(start_date, end_date):
-        populate_database_dict(database_filename, time_per_type, key_type=key_type)
-        if key_type == DatabaseDisplayKey.DATE:
-            # `generated_database_filenames` already returns them in order
-            # from earliest to latest
-            date = _parse_date(database_filename)
-            try:
-                database.append((date, time_per_type[date]))
-            except KeyError:
-                pass
+    if args.views is not None:
+        key_types = args.views
+    else:
+        key_types = [_parse_database_display_key(args)]
+
+    if args.series is not None:
+        if args.views is not None or key_types[0] in (DatabaseDisplayKey.DATE,
+                                                      DatabaseDisplayKey.TREE):
+            parser.error("argument --series: not allowed with argument -d/--dates, -t/--tree, "
+                         "or --views")
+        if args.min_time is not None:
+            parser.error("argument --min-time: not allowed with --series")
+    if args.top is not None and args.top < 1:
+        parser.error("argument --top: must be at least 1")
+
+    ranked = any(key_type not in (DatabaseDisplayKey.DATE, DatabaseDisplayKey.TREE)
+                 for key_type in key_types)
+    if args.top is not None and not ranked:
+        parser.error("argument --top: not allowed with only the date or tree view")
+    if args.min_time is not None and not ranked and DatabaseDisplayKey.TREE not in key_types:
+        parser.error("argument --min-time: not allowed with only the date view")
+    if args.depth is not None and DatabaseDisplayKey.TREE not in key_types:
+        parser.error("argument --depth: only allowed with the tree view")
+    if args.depth is not None and args.depth < 0:
+        parser.error("argument --depth: must be at least 0")
+
+    path_filter = None
+    if args.include_path or args.exclude_path:
+        try:
+            path_filter = PathFilter(include=args.include_path, exclude=args.exclude_path)
+        except re.error as err:
+            parser.error("invalid path regex: {}".format(err))
+
+    if args.series is not None:
+        top = SERIES_DEFAULT_TOP if args.top is None else args.top
+        with _profile_stage("read") as stage:
+            series = database_series(start_date, end_date=end_date, key_type=key_types[0],
+                                     bucket=args.series, top=top, jobs=args.jobs,
+                                     path_filter=path_filter, regex=args.filter)
+            stage["unique_keys"] = {"series": len(series[1])}
+        with _profile_stage("render"):
+            if args.format != "text":
+                write_series(*series, start_date, end_date=end_date,
+                             output_format=args.format)
+            else:
+                print_series(*series, start_date, end_date=end_date)
+        return
+
+    sources = None
+    if args.source:
+        sources = []
+        for pattern in args.source:
+            directories = [directory for directory in glob.glob(os.path.expanduser(pattern))
+                           if os.path.isdir(directory)]
+            if not directories:
+                parser.error("argument --source: no such directory: '{}'".format(pattern))
+            sources.extend(directory for directory in sorted(directories)
+                           if directory not in sources)
+
+    view_names = {key_type: name for name, key_type in VIEW_NAMES.items()}
+    if windows is not None:
+        with _profile_stage("read") as stage:
+            window_views = windowed_database_views(windows, key_types=key_types, jobs=args.jobs,
+                                                   use_index=not args.no_index,
+                                                   path_filter=path_filter)
+            stage["windows"] = len(windows)
+        if args.format != "text":
+            with _profile_stage("render"):
+                write_views(window_views, key_types, start_date, end_date=end_date,
+                            output_format=args.format, regex=args.filter,
+                            max_depth=args.depth, min_seconds=args.min_time, top=args.top,
+                            windows=windows)
+            return
+        for key_type in key_types:
+            for (window_start, window_end), views in zip(windows, window_views):
+                _print_view(views[key_type], key_type, window_start, window_end,
+                            regex=args.filter, verbose=args.verbose, max_depth=args.depth,
+                            min_seconds=args.min_time, top=args.top)
+        return
+
+    try:
+        with _profile_stage("read") as stage:
+            if sources is None:
+                views = database_views(start_date, end_date=end_date, key_types=key_types,
+                                       jobs=args.jobs, use_index=not args.no_index,
+                                       backend=args.backend, path_filter=path_filter)
+            else:
+                source_views = federated_database_views(sources, start_date,
+                                                         end_date=end_date,
+                                                         key_types=key_types, jobs=args.jobs,
+                                                         use_index=not args.no_index,
+                                                         backend=args.backend,
+                                                         path_filter=path_filter)
+                views = merged_database_views(source_views)
+            stage["unique_keys"] = {view_names[key_type]: len(views[key_type])
+                                    for key_type in key_types}
+    except ImportError:
+        parser.error("argument --backend: numpy is not installed")
+
+    if args.by_source:
+        if args.format != "text":
+            with _profile_stage("render"):
+                write_views(source_views, key_types, start_date, end_date=end_date,
+                            output_format=args.format, regex=args.filter,
+                            max_depth=args.depth, min_seconds=args.min_time, top=args.top,
+                            sources=sources)
+            return
+        for key_type in key_types:
+            for source, source_view in zip(sources, source_views):
+                print("==> {} <==".format(source))
+                _print_view(source_view[key_type], key_type, start_date, end_date,
+                            regex=args.filter, verbose=args.verbose, max_depth=args.depth,
+                            min_seconds=args.min_time, top=args.top)
+        return
+
+    if args.format != "text":
+        with _profile_stage("render"):
+            write_views(views, key_types, start_date, end_date=end_date,
+                        output_format=args.format, regex=args.filter, max_depth=args.depth,
+                        min_seconds=args.min_time, top=args.top)
+        return
+    for key_type in key_types:
+        _print_view(views[key_type], key_type, start_date, end_date, regex=args.filter,
+                    verbose=args.verbose, max_depth=args.depth, min_seconds=args.min_time,
+                    top=args.top)
+
+
+def _print_view(time_per_type, key_type, start_date, end_date, regex=None, verbose=False,
+                max_depth=None, min_seconds=None, top=None):
+    # Filter, sort, and print one view of the database
+    if key_type == DatabaseDisplayKey.DATE:
+        # Dates are already in order from earliest to latest (and, as
+        # always, are not affected by the filter)
+        database = list(time_per_type.items())
 
     # By default, the regex used for filtering matches everything
-    regex = r"(^.*$)"
-    if args.filter is not None:
-        regex = args.filter
-        filter_database_dict(time_per_type, regex)
+    if regex is None:
+        regex = r"(^.*$)"
+    else:
+        with _profile_stage("filter", key_type):
+            filter_database_dict(time_per_type, regex)
 
     tree = False
     if key_type == DatabaseDisplayKey.DATE:
@@ -108,230 +1047,2160 @@ def main():
         database = time_per_type.items()
     else:
         # Sort from most to least time
-        database = sorted(time_per_type.items(), key=lambda tup: tup[1], reverse=True)
+        with _profile_stage("sort", key_type):
+            database = ranked_database_items(time_per_type, top=top, min_seconds=min_seconds)
+
+    if verbose:
+        _print_filter_and_sort(key_type, regex)
+        print()
+        print("{} entries".format(len(database)))
+        print()
+
+    with _profile_stage("render", key_type):
+        print_database(database, start_date, end_date=end_date, tree=tree,
+                       max_depth=max_depth, min_seconds=min_seconds)
+
+
+def _parse_database_display_key(args):
+    # Return a `DatabaseDisplayKey` constant based on `argparse` args
+    if args.dates:
+        return DatabaseDisplayKey.DATE
+    elif args.tree:
+        return DatabaseDisplayKey.TREE
+    elif args.paths:
+        return DatabaseDisplayKey.PATH
+    elif args.names:
+        return DatabaseDisplayKey.FILENAME
+
+    return DatabaseDisplayKey.FILETYPE
+
+
+def _parse_views(views):
+    # Return a list of `DatabaseDisplayKey` constants from "dates,names,..."
+    import argparse
+
+    key_types = []
+    for view in views.split(","):
+        try:
+            key_types.append(VIEW_NAMES[view.strip()])
+        except KeyError:
+            raise argparse.ArgumentTypeError(
+                "invalid view: '{}' (choose from {})".format(view, ", ".join(VIEW_NAMES)))
+    return key_types
+
+
+def _parse_date_argument(date):
+    # Return the datetime for a "YYYY-MM-DD" commandline argument
+    import argparse
+
+    try:
+        return datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "invalid date: '{}' (e.g., '2017-11-05')".format(date)) from None
+
+
+def _parse_duration(duration):
+    # Return the number of seconds in "90", "90s", "45m", "1h30m", etc.
+    import argparse
+    import re
+
+    match = re.match(r"^\s*(?:(\d+)h)?\s*(?:(\d+)m)?\s*(?:(\d+)s?)?\s*$", duration)
+    if match is None or not any(match.groups()):
+        raise argparse.ArgumentTypeError(
+            "invalid duration: '{}' (e.g., '90', '45m', or '1h30m')".format(duration))
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return 3600*hours + 60*minutes + seconds
+
+
+@contextmanager
+def profiled(start_time=None):
+    """Return a context manager that makes a new `RunProfile` active.
+
+    The context manager yields the profile, which is no longer active (and so
+    no longer counts anything) once the context is exited.
+
+    Parameters
+    ----------
+    start_time : float, optional
+        Passed on to `RunProfile` (default None).
+
+    """
+    global _run_profile
+    previous = _run_profile
+    _run_profile = RunProfile(start_time=start_time)
+    try:
+        yield _run_profile
+    finally:
+        _run_profile = previous
+
+
+def _profile_stage(name, key_type=None):
+    # Return a context manager that records a stage in the active profile,
+    # if any, yielding a dict to which items about the stage can be added
+    if _run_profile is None:
+        return _ignored_stage()
+    stage = _run_profile.stage(name)
+    if key_type is not None:
+        return _view_stage(stage, key_type)
+    return stage
+
+
+@contextmanager
+def _view_stage(stage, key_type):
+    # Yield what the stage's context manager does, noting the view it's for
+    with stage as stage_items:
+        stage_items["view"] = {key_type: name for name, key_type in VIEW_NAMES.items()}[key_type]
+        yield stage_items
+
+
+@contextmanager
+def _ignored_stage():
+    # Yield a dict like `RunProfile.stage` does, but record nothing
+    yield {}
+
+
+def _print_profile_report(report, report_format="text"):
+    # Print the report of a `RunProfile` to standard error as text or JSON
+    import json
+
+    if report_format == "json":
+        print(json.dumps(report, indent=2), file=sys.stderr)
+        return
+
+    counter_labels = (("files_opened", "files opened"), ("files_missing", "files missing"),
+                      ("lines_parsed", "lines parsed"), ("bytes_read", "bytes read"),
+                      ("index_files_read", "index files read"),
+                      ("binary_caches_read", "binary caches read"))
+    for stage in report["stages"]:
+        if "view" in stage:
+            print("{} ({}):".format(stage["name"], stage["view"]), file=sys.stderr)
+        else:
+            print("{}:".format(stage["name"]), file=sys.stderr)
+        print("\t{:.4f} s, {} KB max RSS".format(stage["seconds"], stage["max_rss_kilobytes"]),
+              file=sys.stderr)
+        counts = ["{} {}".format(stage[counter], label) for counter, label in counter_labels
+                  if counter in stage]
+        if counts:
+            print("\t" + ", ".join(counts), file=sys.stderr)
+        if "unique_keys" in stage:
+            print("\t" + ", ".join("{} unique {}".format(count, view)
+                                   for view, count in stage["unique_keys"].items()),
+                  file=sys.stderr)
+        if "windows" in stage:
+            print("\t{} windows".format(stage["windows"]), file=sys.stderr)
+    print("TOTAL:", file=sys.stderr)
+    print("\t{:.4f} s".format(report["seconds"]), file=sys.stderr)
+
+
+def _print_filter_and_sort(key_type, regex):
+    # Print how the data is being filtered and sorted
+    print('{} -> {}'.format(key_type.name, regex))
+    print()
+
+    if key_type == DatabaseDisplayKey.DATE:
+        print("sorted from least to most recent date")
+    elif key_type == DatabaseDisplayKey.TREE:
+        print("sorted hierarchically and then alphabetically")
+    else:
+        print("sorted from max to min time")
+
+
+def check_database(jobs=None, report_format="text"):
+    """Check for inconsistencies between full database and date databases.
+
+    Print the report from `database_check_report`, either as text or as
+    JSON.
+
+    Parameters
+    ----------
+    jobs : int, optional
+        The number of worker processes used to read the date databases
+        (default as in `populated_database_dicts`).
+    report_format : str, optional
+        Either "text" or "json" (default "text").
+
+    """
+    import json
+
+    report = database_check_report(jobs=jobs)
+
+    if report_format == "json":
+        print(json.dumps(report, indent=2))
+        return
+
+    for entry in report["paths"]:
+        print("{}:".format(entry["path"]))
+        print("\t{} vs {} s (date database vs full)".format(entry["date_seconds"],
+                                                           entry["full_seconds"]))
+    print("TOTAL:")
+    print("\t{} s".format(report["total_seconds_difference"]))
+    print()
+
+    if report["date_databases"]:
+        print("By the last date database to include each path:")
+        for entry in report["date_databases"]:
+            print("{}:".format(entry["filename"]))
+            print("\t{} s across {} paths".format(entry["seconds_difference"], entry["paths"]))
+        print()
+
+    if report["malformed_lines"]:
+        print("Malformed lines:")
+        for entry in report["malformed_lines"]:
+            print("{}:{}".format(entry["filename"], entry["line"]))
+        print()
+
+    if report["skipped_files"]:
+        print("Skipped files:")
+        for filename in report["skipped_files"]:
+            print(filename)
+        print()
+
+
+def database_check_report(jobs=None):
+    """Return inconsistencies between full database and date databases.
+
+    The date databases are read in parallel and their totals merged per
+    path, and then the full database is streamed against those totals, so
+    memory use grows only with the number of distinct paths. Files in
+    `TIMETAP_DIR` that aren't TimeTap databases are skipped, and lines that
+    can't be parsed are reported rather than fatal.
+
+    Parameters
+    ----------
+    jobs : int, optional
+        The number of worker processes used to read the date databases
+        (default as in `populated_database_dicts`).
+
+    Returns
+    -------
+    dict
+        A mapping with the following items:
+
+        "paths"
+            A list, sorted by path, of a dict with the items "path",
+            "date_seconds", "full_seconds", and "last_date_database" for
+            each path whose times in the date databases sum to something
+            other than its time in the full database.
+        "date_databases"
+            A list, sorted by filename, of a dict with the items "filename",
+            "seconds_difference", and "paths" giving, for each date
+            database, the absolute difference summed over, and the number
+            of, the inconsistent paths it was the last to include (and so
+            where the inconsistency likely arose).
+        "malformed_lines"
+            A list of a dict with the items "filename" and "line" (counting
+            from 1) for each line that couldn't be parsed.
+        "skipped_files"
+            A sorted list of the names of files that were not checked,
+            excluding hidden files.
+        "total_seconds_difference"
+            The absolute difference summed over all inconsistent paths.
+
+    """
+    date_filenames = []
+    skipped_files = []
+    for filename in sorted(os.listdir(TIMETAP_DIR)):
+        if _is_date_database_filename(filename):
+            date_filenames.append(filename)
+        elif filename != "full.db" and not filename.startswith("."):
+            # Hidden files (e.g., the index) belong to this program
+            skipped_files.append(filename)
+
+    # Mapping of paths to [DATE_SECONDS, FULL_SECONDS, LAST_DATE_DATABASE]
+    joined_per_path = {}
+    malformed_lines = []
+    checked_files = _parallel_map(_checked_database_file, date_filenames, jobs)
+    for filename, (time_per_path, malformed_line_numbers) in zip(date_filenames,
+                                                                   checked_files):
+        for path, seconds in time_per_path.items():
+            try:
+                joined = joined_per_path[path]
+                joined[0] += seconds
+                joined[2] = filename
+            except KeyError:
+                joined_per_path[path] = [seconds, 0, filename]
+        malformed_lines += [{"filename": filename, "line": line_number}
+                            for line_number in malformed_line_numbers]
+
+    # Stream the full database against the date databases' totals
+    for line_number, line in enumerate(_database_lines("full.db"), start=1):
+        try:
+            path, seconds = _parse_database_line(line)
+        except (ValueError, KeyError, TypeError, AssertionError):
+            malformed_lines.append({"filename": "full.db", "line": line_number})
+            continue
+        try:
+            joined_per_path[path][1] += seconds
+        except KeyError:
+            joined_per_path[path] = [0, seconds, None]
+
+    paths = []
+    drift_per_filename = {}
+    total_seconds_difference = 0
+    for path in sorted(joined_per_path):
+        date_seconds, full_seconds, last_filename = joined_per_path[path]
+        if date_seconds == full_seconds:
+            continue
+        difference = abs(full_seconds - date_seconds)
+        total_seconds_difference += difference
+        paths.append({"path": path, "date_seconds": date_seconds, "full_seconds": full_seconds,
+                      "last_date_database": last_filename})
+        if last_filename is not None:
+            drift = drift_per_filename.setdefault(last_filename, [0, 0])
+            drift[0] += difference
+            drift[1] += 1
+
+    date_databases = [{"filename": filename, "seconds_difference": drift[0], "paths": drift[1]}
+                      for filename, drift in sorted(drift_per_filename.items())]
+
+    return {"paths": paths, "date_databases": date_databases, "malformed_lines": malformed_lines,
+            "skipped_files": skipped_files,
+            "total_seconds_difference": total_seconds_difference}
+
+
+def _checked_database_file(database_filename):
+    # Return (TIME_PER_PATH, MALFORMED_LINE_NUMBERS) for a database
+    time_per_path = {}
+    malformed_line_numbers = []
+    for line_number, line in enumerate(_database_lines(database_filename), start=1):
+        try:
+            path, seconds = _parse_database_line(line)
+        except (ValueError, KeyError, TypeError, AssertionError):
+            malformed_line_numbers.append(line_number)
+            continue
+        time_per_path[path] = time_per_path.get(path, 0) + seconds
+    return time_per_path, malformed_line_numbers
+
+
+def repair_database(rebuild_full=True, compact_dates=False, jobs=None):
+    """Rewrite the databases to make them consistent and compact.
+
+    Treating the date databases as authoritative, rebuild the full database
+    with a single line for each path holding its total across all of them.
+    Optionally, first compact each date database by merging any lines for
+    the same path. Every file is rewritten atomically (written in full
+    under a temporary name and then renamed), but since Vim TimeTap may
+    rewrite a database at any time, today's date database is never
+    compacted, and this is best done while Vim is closed. Date databases
+    with malformed lines are left as is, and the full database is not
+    rebuilt if there are any.
+
+    Parameters
+    ----------
+    rebuild_full : bool, optional
+        True if the full database should be rebuilt (default True).
+    compact_dates : bool, optional
+        True if the date databases should be compacted (default False).
+    jobs : int, optional
+        The number of worker processes used to read (and compact) the date
+        databases (default as in `populated_database_dicts`); in the daemon,
+        they are always read in its own process.
+
+    Returns
+    -------
+    dict
+        A mapping with the items "full_database" (a dict with the items
+        "bytes_before", "bytes_after", and "paths", or None if the full
+        database was not rebuilt), "date_databases" (a dict with the items
+        "compacted", "bytes_before", and "bytes_after"), "skipped_files" (the
+        names of date databases left alone because of malformed lines),
+        "bytes_reclaimed", and "seconds" (the time taken).
+
+    """
+    start_time = time.perf_counter()
+    date_filenames = list(date_database_filenames())
+    today_filename = datetime.today().strftime("%Y%m%d") + ".db"
+
+    skipped_files = []
+    date_databases = {"compacted": 0, "bytes_before": 0, "bytes_after": 0}
+    if compact_dates:
+        compacted_files = _parallel_map(_compacted_database_file, date_filenames, jobs,
+                                        today_filename)
+        for filename, (bytes_before, bytes_after, malformed) in zip(date_filenames,
+                                                                      compacted_files):
+            if malformed:
+                skipped_files.append(filename)
+            elif bytes_after != bytes_before:
+                date_databases["compacted"] += 1
+            date_databases["bytes_before"] += bytes_before
+            date_databases["bytes_after"] += bytes_after
+
+    full_database = None
+    if rebuild_full and date_filenames:
+        time_per_path = {}
+        checked_files = _parallel_map(_checked_database_file, date_filenames, jobs)
+        for filename, (file_time_per_path, malformed_line_numbers) in zip(
+                date_filenames, checked_files):
+            if malformed_line_numbers and filename not in skipped_files:
+                skipped_files.append(filename)
+            for path, seconds in file_time_per_path.items():
+                time_per_path[path] = time_per_path.get(path, 0) + seconds
+
+    # Rebuilding from date databases with unreadable lines would lose data
+    if rebuild_full and date_filenames and not skipped_files:
+        try:
+            bytes_before = os.path.getsize(os.path.join(TIMETAP_DIR, "full.db"))
+        except OSError:
+            bytes_before = 0
+        bytes_after = _replace_database("full.db", time_per_path)
+        full_database = {"bytes_before": bytes_before, "bytes_after": bytes_after,
+                         "paths": len(time_per_path)}
+
+    bytes_reclaimed = date_databases["bytes_before"] - date_databases["bytes_after"]
+    if full_database is not None:
+        bytes_reclaimed += full_database["bytes_before"] - full_database["bytes_after"]
+
+    return {"full_database": full_database, "date_databases": date_databases,
+            "skipped_files": sorted(skipped_files), "bytes_reclaimed": bytes_reclaimed,
+            "seconds": time.perf_counter() - start_time}
+
+
+def _print_repair_report(report, report_format="text"):
+    # Print the report returned by `repair_database` as text or JSON
+    import json
+
+    if report_format == "json":
+        print(json.dumps(report, indent=2))
+        return
+
+    full_database = report["full_database"]
+    if full_database is not None:
+        print("full.db:")
+        print("\t{} paths, {} -> {} bytes".format(full_database["paths"],
+                                                  full_database["bytes_before"],
+                                                  full_database["bytes_after"]))
+    date_databases = report["date_databases"]
+    if date_databases["bytes_before"]:
+        print("date databases:")
+        print("\t{} compacted, {} -> {} bytes".format(date_databases["compacted"],
+                                                      date_databases["bytes_before"],
+                                                      date_databases["bytes_after"]))
+    for filename in report["skipped_files"]:
+        print("{}:".format(filename))
+        print("\tmalformed lines (see --check), so left as is")
+    if report["skipped_files"] and full_database is None:
+        print("full.db:")
+        print("\tnot rebuilt because of malformed lines")
+    print("TOTAL:")
+    print("\t{} bytes reclaimed in {:.2f} s".format(report["bytes_reclaimed"], report["seconds"]))
+    print()
+
+
+def _compacted_database_file(database_filename, today_filename):
+    # Merge lines for the same path in a date database, returning
+    # (BYTES_BEFORE, BYTES_AFTER, MALFORMED)
+    bytes_before = os.path.getsize(os.path.join(TIMETAP_DIR, database_filename))
+    time_per_path, malformed_line_numbers = _checked_database_file(database_filename)
+    if malformed_line_numbers:
+        return bytes_before, bytes_before, True
+    if database_filename == today_filename:
+        return bytes_before, bytes_before, False
+
+    line_count = sum(1 for _ in _database_lines(database_filename))
+    if line_count == len(time_per_path):
+        # Nothing to merge
+        return bytes_before, bytes_before, False
+    return bytes_before, _replace_database(database_filename, time_per_path), False
+
+
+def _replace_database(database_filename, time_per_path):
+    # Atomically replace a database with one line per path, returning its
+    # new size in bytes
+    import shutil
+
+    timetap_db = os.path.join(TIMETAP_DIR, database_filename)
+    # The temporary file is hidden, so nothing mistakes it for a database
+    with _replaced_file(timetap_db, "w") as database:
+        for path, seconds in time_per_path.items():
+            database.write(_database_line(path, seconds) + "\n")
+        try:
+            # The temporary file is only readable by the user to begin with
+            shutil.copymode(timetap_db, database.fileno())
+        except OSError:
+            pass
+
+    return os.path.getsize(timetap_db)
+
+
+def generated_database_filenames(start_date, end_date=None):
+    """Return sorted filenames matching the given date range.
+
+    Generate TimeTap-style filenames (YYYYMMDD.db) for all dates from
+    `start_date` to `end_date` inclusive in order from filenames representing
+    the earliest data to those representing the latest.
+
+    Parameters
+    ----------
+    start_date : datetime instance
+        The earliest date to generate the TimeTap-style filename for.
+    end_date : datetime instance, optional
+        The latest date to generate the TimeTap-style filename for (default
+        today).
+
+    Returns
+    -------
+    list of str
+        A list of TimeTap-style filenames between `start_date` and
+        `end_date` inclusive or a list containing only the filename of the
+        full database if `start_date` is None.
+
+    Examples
+    --------
+    >>> from datetime import datetime
+    >>> import vimtimetap
+    >>> start_date = datetime(year=2017, month=10, day=29)
+    >>> end_date = datetime(year=2017, month=11, day=2)
+    >>> vimtimetap.generated_database_filenames(start_date, end_date=end_date)
+    ['20171029.db', '20171030.db', '20171031.db', '20171101.db', '20171102.db']
+
+    """
+    if start_date is None:
+        return ["full.db"]
+    elif end_date is not None and end_date < start_date:
+        return []
+
+    end_date = datetime.today() if end_date is None else end_date
+    # Step through ordinal days rather than formatting and comparing dates
+    # once per day; the files are of the form YYYYMMDD.db, e.g., 20170310.db
+    # (and this will be in order from earliest date to latest)
+    fromordinal = datetime.fromordinal
+    return ["{:04}{:02}{:02}.db".format(day.year, day.month, day.day)
+            for day in map(fromordinal, range(start_date.toordinal(),
+                                              end_date.toordinal() + 1))]
+
+
+def date_database_filenames(directory=None):
+    """Return the sorted filenames of the date databases that exist.
+
+    The directory is listed again only once its modification time changes,
+    so repeated calls (e.g., from the daemon) usually cost a single `stat`.
+
+    Parameters
+    ----------
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
+
+    Returns
+    -------
+    list of str
+        The TimeTap-style filenames (YYYYMMDD.db) in the directory, in
+        order from the earliest date to the latest. The list is shared
+        between calls and should not be modified.
+
+    """
+    directory = TIMETAP_DIR if directory is None else directory
+    try:
+        stamp = os.stat(directory).st_mtime_ns
+    except OSError:
+        return []
+    listing = _date_database_listings.get(directory)
+    if listing is None or listing[0] != stamp:
+        listing = (stamp, sorted(filename for filename in os.listdir(directory)
+                                 if _is_date_database_filename(filename)))
+        _date_database_listings[directory] = listing
+    return listing[1]
+
+
+def existing_database_filenames(start_date, end_date=None, directory=None):
+    """Return sorted filenames of existing databases in the given date range.
+
+    This is `generated_database_filenames(start_date, end_date)` less the
+    filenames of databases that don't exist, found by bisecting the listing
+    from `date_database_filenames` rather than by generating each filename.
+
+    Parameters
+    ----------
+    start_date : datetime instance
+        The earliest date whose database filename is included.
+    end_date : datetime instance, optional
+        The latest date whose database filename is included (default today).
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
+
+    Returns
+    -------
+    list of str
+        A list of the filenames of existing date databases between
+        `start_date` and `end_date` inclusive or a list containing only the
+        filename of the full database if `start_date` is None.
+
+    """
+    if start_date is None:
+        return ["full.db"]
+    elif end_date is not None and end_date < start_date:
+        return []
+
+    end_date = datetime.today() if end_date is None else end_date
+    filenames = date_database_filenames(directory)
+    low, high = _filename_range(filenames, start_date, end_date)
+    return filenames[low:high]
+
+
+def _filename_range(filenames, start_date, end_date):
+    # Return the (LOW, HIGH) slice of sorted date database filenames that
+    # falls between the dates inclusive; since the names are zero-padded
+    # dates, sorting them sorts the dates
+    low = bisect_left(filenames, "{:04}{:02}{:02}".format(start_date.year, start_date.month,
+                                                          start_date.day))
+    high = bisect_right(filenames, "{:04}{:02}{:02}.db".format(end_date.year, end_date.month,
+                                                               end_date.day))
+    return low, high
+
+
+def period_windows(start_date, end_date, period):
+    """Return the calendar periods covering the given date range.
+
+    Parameters
+    ----------
+    start_date : datetime instance
+        The earliest date covered.
+    end_date : datetime instance
+        The latest date covered.
+    period : str
+        One of `CALENDAR_PERIODS`: "week" (from Monday), "month", "quarter",
+        or "year".
+
+    Returns
+    -------
+    list of (datetime instance, datetime instance) tuple
+        The first and last date of each period overlapping the range, in
+        order from earliest to latest, except that the first and last
+        periods are cut short to start and end with the range.
+
+    Examples
+    --------
+    >>> from datetime import datetime
+    >>> import vimtimetap
+    >>> start_date = datetime(year=2017, month=2, day=10)
+    >>> end_date = datetime(year=2017, month=7, day=4)
+    >>> [(start.strftime("%b %d"), end.strftime("%b %d")) for start, end in
+    ...  vimtimetap.period_windows(start_date, end_date, "quarter")]
+    [('Feb 10', 'Mar 31'), ('Apr 01', 'Jun 30'), ('Jul 01', 'Jul 04')]
+
+    """
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        next_start = _period_start(window_start, period, offset=1)
+        windows.append((window_start, min(end_date, next_start - timedelta(days=1))))
+        window_start = next_start
+    return windows
+
+
+def _period_start(date, period, offset=0):
+    # Return the first date of the calendar period `offset` periods after
+    # the one containing the date
+    if period == "week":
+        return datetime(date.year, date.month, date.day) - timedelta(
+            days=date.weekday() - 7*offset)
+    months = {"month": 1, "quarter": 3, "year": 12}[period]
+    month_index = ((12*date.year + date.month - 1) // months + offset) * months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def database_views(start_date, end_date=None, key_types=None, jobs=None, use_index=True,
+                   backend="python", path_filter=None, directory=None):
+    """Return a database dictionary for each of several key types.
+
+    Each record in the date range is read only once: records are summed
+    per path and per date, and the dictionaries for other key types are
+    derived from the per-path sums.
+
+    Parameters
+    ----------
+    start_date : datetime instance
+        The earliest date whose data will be included or None to include
+        the data in the full database.
+    end_date : datetime instance, optional
+        The latest date whose data will be included (default today).
+    key_types : list of DatabaseDisplayKey constant, optional
+        The key types to return dictionaries for (default all of them).
+    jobs : int, optional
+        The number of worker processes used to read databases (default as
+        in `populated_database_dicts`).
+    use_index : bool, optional
+        True if date ranges should be read through the rollup index and
+        databases through their binary caches when possible and False if
+        the databases should always be read directly (default True).
+    backend : str, optional
+        Either "python" or "numpy", where "numpy" loads the records into
+        NumPy arrays and sums them with array operations instead, without
+        using the rollup index or multiple processes (default "python").
+    path_filter : PathFilter instance, optional
+        If given, only records whose paths it accepts are included, which is
+        decided once per distinct path (default None).
+    directory : str, optional
+        The TimeTap directory to read, whose own index is used (default
+        `TIMETAP_DIR`).
+
+    Returns
+    -------
+    dict of DatabaseDisplayKey constant to dict of str to int
+        A mapping of each key type in `key_types` to a new mapping of names
+        to the number of seconds associated with each name. Dates are in
+        order from earliest to latest.
+
+    Raises
+    ------
+    ImportError
+        If `backend` is "numpy" and NumPy is not installed.
+
+    """
+    key_types = list(DatabaseDisplayKey) if key_types is None else key_types
+    if backend == "numpy":
+        database_filenames = existing_database_filenames(start_date, end_date, directory)
+        return _numpy_database_views(database_filenames, key_types, use_cache=use_index,
+                                     path_filter=path_filter, directory=directory)
+
+    need_paths = any(key_type != DatabaseDisplayKey.DATE for key_type in key_types)
+    time_per_date = {}
+    time_per_path = {}
+
+    # A single day's database is as quick to read as the index, which would
+    # have to be brought up to date first
+    single_day = start_date is not None and _equal_dates(
+        start_date, datetime.today() if end_date is None else end_date)
+
+    indexed = False
+    # The daemon's in-memory cache is faster than the index
+    if use_index and start_date is None and _database_cache is None:
+        # The index doesn't cover the full database, but its binary cache
+        # is nearly as quick to read
+        time_per_path = _time_per_path_from_columns(*database_columns("full.db", directory))
+        if path_filter is not None:
+            time_per_path = {path: seconds for path, seconds in time_per_path.items()
+                             if path_filter(path)}
+        if time_per_path:
+            time_per_date[_parse_date("full.db")] = sum(time_per_path.values())
+        indexed = True
+    elif use_index and not single_day and _database_cache is None:
+        try:
+            if DatabaseDisplayKey.DATE in key_types:
+                populate_database_dict_from_index(start_date, time_per_date, end_date=end_date,
+                                                  key_type=DatabaseDisplayKey.DATE, jobs=jobs,
+                                                  path_filter=path_filter, directory=directory)
+            if need_paths:
+                populate_database_dict_from_index(start_date, time_per_path, end_date=end_date,
+                                                  key_type=DatabaseDisplayKey.PATH, jobs=jobs,
+                                                  path_filter=path_filter, directory=directory)
+            indexed = True
+        except OSError:
+            # E.g., `TIMETAP_DIR` is read-only: fall back to the databases
+            time_per_date.clear()
+            time_per_path.clear()
+
+    if not indexed:
+        if single_day:
+            # Not worth listing the directory for: a missing database is
+            # just skipped
+            database_filenames = generated_database_filenames(start_date, start_date)
+        else:
+            database_filenames = existing_database_filenames(start_date, end_date, directory)
+        file_dicts = populated_database_dicts(database_filenames,
+                                              key_type=DatabaseDisplayKey.PATH, jobs=jobs,
+                                              path_filter=path_filter, directory=directory)
+        # `existing_database_filenames` returns them in order from earliest
+        # to latest
+        for database_filename, file_time_per_path in zip(database_filenames, file_dicts):
+            if file_time_per_path:
+                time_per_date[_parse_date(database_filename)] = sum(file_time_per_path.values())
+            for path, seconds in file_time_per_path.items():
+                time_per_path[path] = time_per_path.get(path, 0) + seconds
+
+    return _derived_database_views(time_per_date, time_per_path, key_types)
+
+
+def _derived_database_views(time_per_date, time_per_path, key_types):
+    # Return the views of the given key types derived from the sums per date
+    # and per path
+    views = {}
+    for key_type in key_types:
+        if key_type == DatabaseDisplayKey.DATE:
+            views[key_type] = dict(time_per_date)
+        else:
+            views[key_type] = _derived_database_dict(time_per_path, key_type)
+    return views
+
+
+def _summed_database_views(database_filenames, file_dicts, key_types=None, path_filter=None):
+    # Return views like those of `database_views` from the seconds per path
+    # in each of the date databases (or the full database), which are in
+    # order from earliest to latest
+    key_types = list(DatabaseDisplayKey) if key_types is None else key_types
+    time_per_date = {}
+    time_per_path = {}
+    for database_filename, file_time_per_path in zip(database_filenames, file_dicts):
+        if path_filter is not None:
+            file_time_per_path = {path: seconds for path, seconds in file_time_per_path.items()
+                                  if path_filter(path)}
+        if not file_time_per_path:
+            continue
+        time_per_date[_parse_date(database_filename)] = sum(file_time_per_path.values())
+        for path, seconds in file_time_per_path.items():
+            time_per_path[path] = time_per_path.get(path, 0) + seconds
+    return _derived_database_views(time_per_date, time_per_path, key_types)
+
+
+def windowed_database_views(windows, key_types=None, jobs=None, use_index=True,
+                            path_filter=None):
+    """Return views of the database for each of several date ranges.
+
+    This is like calling `database_views` for each range, except that the
+    rollup index is brought up to date only once for all of them, and
+    calendar weeks, months, and years are each summed from a single rollup.
+    Without the index, each date database is read at most once (even where
+    the ranges overlap) and its sums are shared by every range that
+    includes it.
+
+    Parameters
+    ----------
+    windows : list of (datetime instance, datetime instance) tuple
+        The first and last date of each range (e.g., from `period_windows`).
+    key_types : list of DatabaseDisplayKey constant, optional
+        The key types to return dictionaries for (default all of them).
+    jobs : int, optional
+        The number of worker processes used to read databases (default as
+        in `populated_database_dicts`).
+    use_index : bool, optional
+        True if the rollup index should be used, and False if the date
+        databases should be read directly (default True).
+    path_filter : PathFilter instance, optional
+        If given, only records whose paths it accepts are included (default
+        None).
+
+    Returns
+    -------
+    list of dict of DatabaseDisplayKey constant to dict of str to int
+        A mapping like that returned by `database_views` for each range, in
+        the same order as `windows`.
+
+    """
+    key_types = list(DatabaseDisplayKey) if key_types is None else key_types
+    if not windows:
+        return []
+
+    # The daemon's in-memory cache is faster than the index
+    if use_index and _database_cache is None:
+        try:
+            return _indexed_window_views(windows, key_types, jobs, path_filter)
+        except OSError:
+            # E.g., `TIMETAP_DIR` is read-only: fall back to the databases
+            pass
+
+    database_filenames = existing_database_filenames(min(start for start, _ in windows),
+                                                     max(end for _, end in windows))
+    # The numbers of the windows that include each database
+    file_windows = [[] for _ in database_filenames]
+    for window_number, (start_date, end_date) in enumerate(windows):
+        for file_number in range(*_filename_range(database_filenames, start_date, end_date)):
+            file_windows[file_number].append(window_number)
+
+    window_sums = [({}, {}) for _ in windows]
+    file_dicts = populated_database_dicts(database_filenames, key_type=DatabaseDisplayKey.PATH,
+                                          jobs=jobs, path_filter=path_filter)
+    for database_filename, window_numbers, file_time_per_path in zip(
+            database_filenames, file_windows, file_dicts):
+        if not file_time_per_path:
+            continue
+        date = _parse_date(database_filename)
+        file_seconds = sum(file_time_per_path.values())
+        for window_number in window_numbers:
+            time_per_date, time_per_path = window_sums[window_number]
+            time_per_date[date] = file_seconds
+            for path, seconds in file_time_per_path.items():
+                time_per_path[path] = time_per_path.get(path, 0) + seconds
+
+    return [_derived_database_views(time_per_date, time_per_path, key_types)
+            for time_per_date, time_per_path in window_sums]
+
+
+def _indexed_window_views(windows, key_types, jobs, path_filter):
+    # Return `windowed_database_views` summed from the rollup index, which
+    # stays locked while it's read as in `populate_database_dict_from_index`
+    with _index_lock():
+        try:
+            manifest = _updated_index(jobs=jobs)
+            return [_window_views_from_index(start_date, end_date, key_types, manifest,
+                                             path_filter)
+                    for start_date, end_date in windows]
+        except ValueError:
+            # A rollup the manifest counts on is missing or corrupt
+            manifest = _updated_index(jobs=jobs, rebuild=True)
+            return [_window_views_from_index(start_date, end_date, key_types, manifest,
+                                             path_filter)
+                    for start_date, end_date in windows]
+
+
+def _window_views_from_index(start_date, end_date, key_types, manifest, path_filter):
+    # Return the views of one range from the up-to-date index with the given
+    # manifest
+    time_per_date = {}
+    time_per_path = {}
+    if DatabaseDisplayKey.DATE in key_types:
+        time_per_date = _database_dict_from_index(start_date, end_date, DatabaseDisplayKey.DATE,
+                                                  manifest, path_filter)
+    if any(key_type != DatabaseDisplayKey.DATE for key_type in key_types):
+        time_per_path = _database_dict_from_index(start_date, end_date, DatabaseDisplayKey.PATH,
+                                                  manifest, path_filter)
+    return _derived_database_views(time_per_date, time_per_path, key_types)
+
+
+def federated_database_views(sources, start_date, end_date=None, key_types=None, jobs=None,
+                             use_index=True, backend="python", path_filter=None):
+    """Return views of the databases in each of several TimeTap directories.
+
+    Each directory is read as `database_views` reads `TIMETAP_DIR`, with its
+    own rollup index and binary caches, and the directories are spread
+    across a pool of worker processes.
+
+    Parameters
+    ----------
+    sources : list of str
+        The directories to read, each laid out like `TIMETAP_DIR`.
+    jobs : int, optional
+        The number of worker processes to use, where 1 means the directories
+        are read in this process (default the CPU count).
+
+    The other parameters are as for `database_views`.
+
+    Returns
+    -------
+    list of dict of DatabaseDisplayKey constant to dict of str to int
+        A mapping like that returned by `database_views` for each source, in
+        the same order as `sources`.
+
+    Raises
+    ------
+    ImportError
+        If `backend` is "numpy" and NumPy is not installed.
+
+    """
+    jobs = (os.cpu_count() or 1) if jobs is None else jobs
+    return list(_parallel_map(_source_database_views, sources, jobs, start_date, end_date,
+                              key_types, use_index, backend, path_filter))
+
+
+def merged_database_views(source_views):
+    """Return the sum of views like those returned by `database_views`.
+
+    Parameters
+    ----------
+    source_views : list of dict of DatabaseDisplayKey constant to dict of str to int
+        Mappings like that returned by `database_views`, all with the same
+        views (e.g., from `federated_database_views`).
+
+    Returns
+    -------
+    dict of DatabaseDisplayKey constant to dict of str to int
+        A mapping of each view to the sum of that view over `source_views`.
+        Dates are still in order from earliest to latest.
+
+    """
+    views = {}
+    for source in source_views:
+        for key_type, database_dict in source.items():
+            merged_dict = views.setdefault(key_type, {})
+            for key, seconds in database_dict.items():
+                merged_dict[key] = merged_dict.get(key, 0) + seconds
+
+    time_per_date = views.get(DatabaseDisplayKey.DATE)
+    if time_per_date and "ALL" not in time_per_date:
+        # Each source's dates are in order, but not all sources have the same
+        # dates
+        views[DatabaseDisplayKey.DATE] = dict(sorted(
+            time_per_date.items(), key=lambda tup: datetime.strptime(tup[0], "%Y %b %d")))
+    return views
+
+
+def _source_database_views(source, start_date, end_date, key_types, use_index, backend,
+                           path_filter):
+    # Return `database_views` of the given directory, for `_parallel_map`
+    return database_views(start_date, end_date=end_date, key_types=key_types, jobs=1,
+                          use_index=use_index, backend=backend, path_filter=path_filter,
+                          directory=source)
+
+
+def _numpy_database_views(database_filenames, key_types, use_cache=True, path_filter=None,
+                          directory=None):
+    # Return what `database_views` does for the files using NumPy arrays
+    import numpy
+
+    # Columns of (DAY, PATH_ID, SECONDS) records, where days index
+    # `database_filenames` and path IDs are assigned in order of appearance
+    day_chunks = [numpy.zeros(0, dtype=numpy.intp)]
+    path_chunks = [numpy.zeros(0, dtype=numpy.intp)]
+    seconds_chunks = [numpy.zeros(0, dtype=numpy.int64)]
+    path_ids = {}
+    for day, database_filename in enumerate(database_filenames):
+        if use_cache:
+            paths, file_path_ids, file_seconds = database_columns(database_filename, directory)
+        else:
+            paths, file_path_ids, file_seconds = _parsed_database_columns(database_filename,
+                                                                          directory)
+        if not paths:
+            continue
+        file_path_ids = numpy.frombuffer(file_path_ids, dtype=numpy.uint32)
+        file_seconds = numpy.frombuffer(file_seconds, dtype=numpy.int64)
+        if path_filter is not None:
+            accepted = numpy.fromiter((path_filter(path) for path in paths), dtype=bool,
+                                      count=len(paths))
+            kept = accepted[file_path_ids]
+            file_path_ids = file_path_ids[kept]
+            file_seconds = file_seconds[kept]
+            paths = [path if path_accepted else None
+                     for path, path_accepted in zip(paths, accepted)]
+        # Map the file's own path IDs to those shared by all the files (where
+        # rejected paths get none at all)
+        global_path_ids = numpy.fromiter(
+            (-1 if path is None else path_ids.setdefault(path, len(path_ids)) for path in paths),
+            dtype=numpy.intp, count=len(paths))
+        path_chunks.append(global_path_ids[file_path_ids])
+        seconds_chunks.append(file_seconds)
+        day_chunks.append(numpy.full(len(file_seconds), day, dtype=numpy.intp))
+
+    days = numpy.concatenate(day_chunks)
+    path_indices = numpy.concatenate(path_chunks)
+    seconds = numpy.concatenate(seconds_chunks)
+
+    # `bincount` sums weights as floats, which is exact for any realistic
+    # number of seconds (i.e., fewer than 2**53)
+    views = {}
+    if DatabaseDisplayKey.DATE in key_types:
+        day_counts = numpy.bincount(days, minlength=len(database_filenames))
+        day_totals = numpy.bincount(days, weights=seconds, minlength=len(database_filenames))
+        views[DatabaseDisplayKey.DATE] = {
+            _parse_date(database_filenames[day]): int(day_totals[day])
+            for day in numpy.flatnonzero(day_counts)
+        }
+
+    path_totals = numpy.bincount(path_indices, weights=seconds, minlength=len(path_ids))
+    for key_type in key_types:
+        if key_type == DatabaseDisplayKey.DATE:
+            continue
+        # Keys are likewise numbered in order of appearance, so the
+        # resulting dict is ordered just as `_derived_database_dict` would be
+        key_ids = {}
+        path_keys = numpy.fromiter(
+            (key_ids.setdefault(_parse_key(path, key_type), len(key_ids)) for path in path_ids),
+            dtype=numpy.intp, count=len(path_ids))
+        key_totals = numpy.bincount(path_keys, weights=path_totals, minlength=len(key_ids))
+        views[key_type] = dict(zip(key_ids, key_totals.astype(numpy.int64).tolist()))
+
+    return views
+
+
+def database_series(start_date, end_date=None, key_type=None, bucket="day", top=None, jobs=None,
+                    path_filter=None, regex=None):
+    """Return the time per key in each day, week, or month of a date range.
+
+    The date databases in the range are read once, each as a row of the
+    matrix, and the rows are then summed into buckets.
+
+    Parameters
+    ----------
+    start_date : datetime instance
+        The earliest date whose data will be included or None for all the
+        date databases.
+    end_date : datetime instance, optional
+        The latest date whose data will be included (default today).
+    key_type : DatabaseDisplayKey constant, optional
+        How keys are formed from paths; anything but DatabaseDisplayKey.DATE
+        and DatabaseDisplayKey.TREE (default DatabaseDisplayKey.FILETYPE).
+    bucket : str, optional
+        One of "day", "week" (ISO weeks, from Monday), "month", or
+        "quarter" (default "day").
+    top : int, optional
+        If given, only the `top` keys with the most time over the whole
+        range are kept, and the time of every other key is summed under the
+        key "OTHER" (default None).
+    jobs : int, optional
+        The number of worker processes used to read the date databases
+        (default as in `populated_database_dicts`).
+    path_filter : PathFilter instance, optional
+        If given, only paths it accepts are included (default None).
+    regex : str, optional
+        If given, only keys it matches are included, as with
+        `filter_database_dict` (default None).
+
+    Returns
+    -------
+    tuple of (list of str, list of str, list of list of int)
+        The labels of the buckets that have data, in order from earliest to
+        latest and of the form YYYY-MM-DD, YYYY-Www, YYYY-MM, or YYYY-Qn; the
+        keys in order from most to least time; and, for each bucket, the
+        number of seconds of each key.
+
+    """
+    import heapq
+
+    key_type = DatabaseDisplayKey.FILETYPE if key_type is None else key_type
+    if start_date is None:
+        database_filenames = list(date_database_filenames())
+    else:
+        database_filenames = existing_database_filenames(start_date, end_date)
+
+    labels = []
+    # A mapping of keys to seconds for each bucket in `labels`
+    bucket_dicts = []
+    for database_filename, file_dict in zip(database_filenames, populated_database_dicts(
+            database_filenames, key_type=key_type, jobs=jobs, path_filter=path_filter)):
+        if not file_dict:
+            continue
+        label = _series_bucket_label(database_filename, bucket)
+        if not labels or labels[-1] != label:
+            labels.append(label)
+            bucket_dicts.append({})
+        bucket_dict = bucket_dicts[-1]
+        for key, seconds in file_dict.items():
+            bucket_dict[key] = bucket_dict.get(key, 0) + seconds
+
+    time_per_key = {}
+    for bucket_dict in bucket_dicts:
+        for key, seconds in bucket_dict.items():
+            time_per_key[key] = time_per_key.get(key, 0) + seconds
+    if regex is not None:
+        filter_database_dict(time_per_key, regex)
+
+    if top is None or top >= len(time_per_key):
+        keys = [key for key, _ in sorted(time_per_key.items(), key=lambda tup: tup[1],
+                                         reverse=True)]
+        other = False
+    else:
+        keys = [key for key, _ in heapq.nlargest(top, time_per_key.items(),
+                                                 key=lambda tup: tup[1])]
+        other = True
+
+    series_labels = []
+    rows = []
+    for label, bucket_dict in zip(labels, bucket_dicts):
+        row = [bucket_dict.get(key, 0) for key in keys]
+        if other:
+            row.append(sum(seconds for key, seconds in bucket_dict.items()
+                           if key in time_per_key) - sum(row))
+        if any(row):
+            # Leave out buckets whose keys were all filtered out
+            series_labels.append(label)
+            rows.append(row)
+    if other:
+        keys.append("OTHER")
+
+    return series_labels, keys, rows
+
+
+def _series_bucket_label(filename, bucket):
+    # Return the label of the bucket containing a date database's date
+    year, month, day = int(filename[:4]), int(filename[4:6]), int(filename[6:8])
+    if bucket == "day":
+        return "{:04}-{:02}-{:02}".format(year, month, day)
+    elif bucket == "month":
+        return "{:04}-{:02}".format(year, month)
+    elif bucket == "quarter":
+        return "{:04}-Q{}".format(year, (month - 1) // 3 + 1)
+    iso_year, iso_week, _ = datetime(year, month, day).isocalendar()
+    return "{:04}-W{:02}".format(iso_year, iso_week)
+
+
+def _derived_database_dict(time_per_path, key_type):
+    # Return a new database dict keyed by `key_type` from one keyed by path
+    database_dict = {}
+    for path, seconds in time_per_path.items():
+        filetitle = _parse_key(path, key_type)
+        try:
+            database_dict[filetitle] += seconds
+        except KeyError:
+            database_dict[filetitle] = seconds
+    return database_dict
+
+
+def populate_database_dict(database_filename, database_dict, key_type=None, path_filter=None,
+                           directory=None):
+    """Populate given database dictionary with data from given file.
+
+    Add or update mappings of names (e.g., filenames, dates---the exact
+    format is determined by `key_type`) to the number of seconds associated
+    with that name based on data in the file called `database_filename`,
+    which has a format like the following:
+
+    {'/tmp/crontab.t1M3Tp/crontab': {'total': 134}}
+    {'/etc/ssmtp/ssmtp.conf': {'total': 1873}}
+    {'/home/user/.bashrc': {'total': 636}}
+
+    Parameters
+    ----------
+    database_filename : str
+        The name of a file in `directory` from which data will be pulled to
+        add to or update `database_dict`.
+    database_dict : dict of str to int
+        A mapping of names (e.g., of filenames, paths, dates, etc.) to the
+        number of seconds associated with each name, which will be updated
+        with new mappings or incremented times.
+    key_type : DatabaseDisplayKey constant, optional
+        A constant that determines what type of key is used in populating
+        the `database_dict` (default DatabaseDisplayKey.FILETYPE).
+    path_filter : PathFilter instance, optional
+        If given, only records whose paths it accepts are included (default
+        None).
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
+
+    """
+    key_type = DatabaseDisplayKey.FILETYPE if key_type is None else key_type
+
+    if key_type == DatabaseDisplayKey.DATE:
+        # This will be the same for all records in the file, so it's not
+        # worth recalculating it each iteration
+        file_date = _parse_date(database_filename)
+
+    for path, seconds in database_records(database_filename, directory):
+        if path_filter is not None and not path_filter(path):
+            continue
+
+        if key_type == DatabaseDisplayKey.DATE:
+            filetitle = file_date
+        else:
+            filetitle = _parse_key(path, key_type)
+
+        try:
+            database_dict[filetitle] += seconds
+        except KeyError:
+            database_dict[filetitle] = seconds
+
+
+def populated_database_dicts(database_filenames, key_type=None, jobs=None, path_filter=None,
+                             directory=None):
+    """Yield a new database dictionary for each of the given files.
+
+    This is equivalent to calling `populate_database_dict` with an empty
+    dictionary for each filename in turn, except that the files may be read
+    in parallel by a pool of worker processes.
+
+    Parameters
+    ----------
+    database_filenames : list of str
+        The names of files in `directory` from which data will be pulled.
+    key_type : DatabaseDisplayKey constant, optional
+        A constant that determines what type of key is used in populating
+        each dictionary (default DatabaseDisplayKey.FILETYPE).
+    jobs : int, optional
+        The number of worker processes to use, where 1 means the files are
+        read in this process (default the CPU count if there are at least
+        `PARALLEL_MIN_FILES` files and 1 otherwise). It is always 1 in the
+        daemon.
+    path_filter : PathFilter instance, optional
+        If given, only records whose paths it accepts are included (default
+        None).
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
+
+    Yields
+    ------
+    dict of str to int
+        A mapping of names to the number of seconds associated with each
+        name for each file, in the same order as `database_filenames`.
+
+    """
+    yield from _parallel_map(_populated_database_dict, database_filenames, jobs, key_type,
+                             path_filter, directory)
+
+
+def _parallel_map(function, database_filenames, jobs, *args):
+    # Yield `function(filename, *args)` for each filename in order, calling
+    # it in worker processes as `populated_database_dicts` describes
+    if _database_cache is not None:
+        # Worker processes wouldn't share the daemon's cache, and forking
+        # the daemon, which runs other threads, could deadlock
+        jobs = 1
+    elif jobs is None:
+        jobs = (os.cpu_count() or 1) if len(database_filenames) >= PARALLEL_MIN_FILES else 1
+    jobs = min(jobs, len(database_filenames))
+
+    if jobs <= 1:
+        for database_filename in database_filenames:
+            yield function(database_filename, *args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Hand each worker several files at a time to cut down on messaging
+    chunksize = max(1, len(database_filenames) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(function, database_filenames, *(repeat(arg) for arg in args),
+                                chunksize=chunksize)
+
+
+def _populated_database_dict(database_filename, key_type, path_filter=None, directory=None):
+    # Return a new database dict populated from the given file (or, in the
+    # daemon, a cached one that must not be modified)
+    if _database_cache is not None and directory is None:
+        if path_filter is None:
+            return _cached_database_dict(database_filename, key_type)
+        elif key_type == DatabaseDisplayKey.PATH or key_type == DatabaseDisplayKey.TREE:
+            return {path: seconds
+                    for path, seconds in _cached_database_dict(database_filename, key_type).items()
+                    if path_filter(path)}
+
+    database_dict = {}
+    populate_database_dict(database_filename, database_dict, key_type=key_type,
+                           path_filter=path_filter, directory=directory)
+    return database_dict
+
+
+def database_records(database_filename, directory=None):
+    """Yield each record in the given TimeTap database file.
+
+    Lines are read and parsed one at a time, so memory use does not grow
+    with the size of the file (which matters most for "full.db").
+
+    Parameters
+    ----------
+    database_filename : str
+        The name of a file in `directory` whose records will be yielded.
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
+
+    Yields
+    ------
+    (str, int) tuple
+        A tuple of the form (PATH, SECONDS) for each line in the file, in
+        the order they appear; nothing is yielded if the file cannot be
+        opened.
+
+    """
+    for line in _database_lines(database_filename, directory):
+        yield _parse_database_line(line)
+
+
+def _database_lines(database_filename, directory=None):
+    # Yield each line, without its line ending, of a database if it exists
+    try:
+        database = open(_database_path(database_filename, directory), "r")
+    except IOError:
+        if _run_profile is not None:
+            _run_profile.count("files_missing")
+        return
+
+    with database:
+        if _run_profile is None:
+            for line in database:
+                yield line.rstrip("\r\n")
+            return
+
+        # Counted per file, so unprofiled runs don't pay for it per line
+        run_profile = _run_profile
+        run_profile.count("files_opened")
+        line_count = 0
+        for line in database:
+            line_count += 1
+            yield line.rstrip("\r\n")
+        run_profile.count("lines_parsed", line_count)
+        run_profile.count("bytes_read", os.fstat(database.fileno()).st_size)
+
+
+def _database_path(database_filename, directory=None):
+    # Return the path of a database in the directory (or `TIMETAP_DIR`)
+    return os.path.join(TIMETAP_DIR if directory is None else directory, database_filename)
+
+
+def _database_line(path, seconds):
+    # Return a line like "{'/home/user/a.py': {'total': 104}}", escaping
+    # single quotes as Vim's `string()` does
+    return "{'" + path.replace("'", "''") + _DATABASE_LINE_SEPARATOR + str(seconds) + "}}"
+
+
+def _parse_database_line(line):
+    # Return (PATH, SECONDS) from a line like "{'/home/user/a.py': {'total': 104}}"
+    path, separator, rest = line.rpartition(_DATABASE_LINE_SEPARATOR)
+    if separator and path[:2] == "{'" and rest[-2:] == "}}":
+        path = path[2:]
+        if "'" not in path:
+            try:
+                return path, int(rest[:-2])
+            except ValueError:
+                pass
+        elif "'" not in path.replace("''", ""):
+            # Vim's `string()` escapes a single quote by doubling it
+            try:
+                return path.replace("''", "'"), int(rest[:-2])
+            except ValueError:
+                pass
+
+    # Fall back to treating anything unexpected as JSON with single quotes
+    import json
+    line_dict = json.loads(line.replace("'", '"'))
+
+    # Only one path key should be in each `line_dict`
+    assert len(line_dict) == 1
+    path = list(line_dict).pop()
+    return path, line_dict[path]["total"]
+
+
+def _parse_date(filename):
+    # Return a %Y %b %d formatted string based on TimeTap database filename
+    try:
+        # `filename` has the form "YYYYMMDD.db"
+        file_year = int(filename[:4])
+        file_month = int(filename[4:6])
+        file_day = int(filename[6:8])
+    except ValueError:
+        # "full.db", the datebase containing all data, is the only TimeTap
+        # database file whose name doesn't follow the "YYYYMMDD.db" format
+        assert filename == "full.db"
+        return "ALL"
+
+    # These should always be valid
+    file_date = datetime(year=file_year, month=file_month, day=file_day)
+    return file_date.strftime("%Y %b %d")
+
+
+def _parse_key(path, key_type):
+    # Return the key for a path based on a non-date `DatabaseDisplayKey`
+    if key_type == DatabaseDisplayKey.PATH or key_type == DatabaseDisplayKey.TREE:
+        return path
+    elif key_type == DatabaseDisplayKey.FILENAME:
+        return os.path.basename(path)
+    return _parse_filetype(path)
+
+
+def _parse_filetype(path):
+    # Return filetype of filename at end of given path
+    _, extension = os.path.splitext(path)
+    extension = "*" + extension if extension else os.path.basename(path)
+    extension = extension if extension else "OTHER"
+    return extension
+
+
+def update_index(jobs=None, directory=None):
+    """Bring the rollup index up to date with the date databases.
+
+    The index in ".index" (`INDEX_DIR` for `TIMETAP_DIR`) holds, for every
+    date database (YYYYMMDD.db), a per-day rollup of paths to seconds along
+    with per-ISO-week, per-month, and per-year rollups summing those days.
+    Only date databases whose modification time or size has changed since
+    the last update are read, and the coarser rollups containing them are
+    adjusted by the difference rather than rebuilt. Concurrent updates
+    (e.g., by separate runs) take turns through a lock on the index, and if
+    a rollup the index depends on is missing or corrupt, the whole index is
+    rebuilt.
+
+    Parameters
+    ----------
+    jobs : int, optional
+        The number of worker processes used to read changed date databases
+        (default as in `populated_database_dicts`).
+    directory : str, optional
+        The TimeTap directory whose index is updated (default `TIMETAP_DIR`).
+
+    Returns
+    -------
+    dict
+        The index manifest, whose "days" item maps each date database
+        filename to a list of the form [MTIME_NS, SIZE, TOTAL], where TOTAL
+        is the number of seconds in that database or None if it is empty.
+
+    Raises
+    ------
+    OSError
+        If the index cannot be read or written.
+
+    """
+    with _index_lock(directory):
+        return _updated_index(jobs=jobs, directory=directory)
+
+
+@contextmanager
+def _index_lock(directory=None):
+    # Hold an exclusive lock on the index, so that concurrent runs (e.g., a
+    # status line and a query by hand) never update it at the same time
+    import fcntl
+
+    index_dir = _index_dir(directory)
+    try:
+        # Unlike `os.makedirs`, this raises FileNotFoundError rather than
+        # create a TimeTap directory that doesn't exist
+        os.mkdir(index_dir)
+    except FileExistsError:
+        pass
+    with open(os.path.join(index_dir, "lock"), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _updated_index(jobs=None, rebuild=False, directory=None):
+    # Do what `update_index` does with the index already locked, rebuilding
+    # it from scratch if any rollup it depends on is missing or corrupt
+    if not rebuild:
+        try:
+            return _refreshed_index(jobs=jobs, directory=directory)
+        except ValueError:
+            pass
+    return _refreshed_index(jobs=jobs, rebuild=True, directory=directory)
+
+
+def _refreshed_index(jobs=None, rebuild=False, directory=None):
+    # Bring the locked index up to date as `update_index` describes, raising
+    # ValueError if a rollup that should exist is missing or corrupt
+    import shutil
+
+    index_dir = _index_dir(directory)
+    manifest_filename = os.path.join(index_dir, "manifest.json")
+    manifest = _load_index_json(manifest_filename)
+    # A missing or outdated manifest means no rollup on disk can be trusted
+    rebuild = rebuild or manifest.get("version") != INDEX_VERSION
+    if rebuild:
+        manifest = {"version": INDEX_VERSION, "days": {}}
+        for kind in ("day", "week", "month", "year"):
+            shutil.rmtree(os.path.join(index_dir, kind), ignore_errors=True)
+    indexed_days = manifest["days"]
+
+    current_days = {}
+    for filename in date_database_filenames(directory):
+        try:
+            stat = os.stat(_database_path(filename, directory))
+        except FileNotFoundError:
+            # Deleted since it was listed
+            continue
+        current_days[filename] = [stat.st_mtime_ns, stat.st_size]
+
+    stale_days = [filename for filename, stamp in sorted(current_days.items())
+                  if indexed_days.get(filename, [None, None])[:2] != stamp]
+    stale_days += [filename for filename in sorted(indexed_days)
+                   if filename not in current_days]
+    if not stale_days:
+        return manifest
+
+    # Without a manifest, the next update rebuilds everything, so an
+    # interrupted update can never leave rollups counted twice
+    os.makedirs(index_dir, exist_ok=True)
+    try:
+        os.remove(manifest_filename)
+    except FileNotFoundError:
+        pass
+
+    rollups = {}
+    # The days already counted in the rollups on disk
+    previous_days = set(indexed_days)
+    new_dicts = populated_database_dicts(stale_days, key_type=DatabaseDisplayKey.PATH, jobs=jobs,
+                                         directory=directory)
+    for filename, new_time_per_path in zip(stale_days, new_dicts):
+        day_rollup_filename = _index_rollup_filename("day", filename[:8], directory)
+        old_time_per_path = {}
+        if not rebuild and filename in indexed_days:
+            old_time_per_path = _load_index_rollup("day", filename[:8], previous_days,
+                                                   directory)
+
+        if filename in current_days:
+            _dump_index_json(day_rollup_filename, new_time_per_path)
+            total = sum(new_time_per_path.values()) if new_time_per_path else None
+            indexed_days[filename] = current_days[filename] + [total]
+        else:
+            try:
+                os.remove(day_rollup_filename)
+            except FileNotFoundError:
+                pass
+            del indexed_days[filename]
+
+        for period in _index_periods(datetime.strptime(filename[:8], "%Y%m%d")):
+            if period not in rollups:
+                rollups[period] = {} if rebuild else _load_index_rollup(*period,
+                                                                        previous_days,
+                                                                        directory)
+            rollup = rollups[period]
+            for path, seconds in old_time_per_path.items():
+                rollup[path] = rollup.get(path, 0) - seconds
+                if not rollup[path]:
+                    del rollup[path]
+            for path, seconds in new_time_per_path.items():
+                rollup[path] = rollup.get(path, 0) + seconds
+
+    for period, rollup in rollups.items():
+        _dump_index_json(_index_rollup_filename(*period, directory), rollup)
+    _dump_index_json(manifest_filename, manifest)
+
+    return manifest
+
+
+def populate_database_dict_from_index(start_date, database_dict, end_date=None, key_type=None,
+                                      jobs=None, path_filter=None, directory=None):
+    """Populate given database dictionary with data from the rollup index.
+
+    This is equivalent to calling `populate_database_dict` on each filename
+    from `generated_database_filenames(start_date, end_date)`, but the date
+    range is covered by as few year, month, and week rollups as possible,
+    with single days used only at its edges.
+
+    Parameters
+    ----------
+    start_date : datetime instance
+        The earliest date whose data will be included.
+    database_dict : dict of str to int
+        A mapping of names (e.g., of filenames, paths, dates, etc.) to the
+        number of seconds associated with each name, which will be updated
+        with new mappings or incremented times. Dates are added in order
+        from earliest to latest.
+    end_date : datetime instance, optional
+        The latest date whose data will be included (default today).
+    key_type : DatabaseDisplayKey constant, optional
+        A constant that determines what type of key is used in populating
+        the `database_dict` (default DatabaseDisplayKey.FILETYPE).
+    jobs : int, optional
+        The number of worker processes used to read changed date databases
+        (default as in `populated_database_dicts`).
+    path_filter : PathFilter instance, optional
+        If given, only paths it accepts are included (default None).
+    directory : str, optional
+        The TimeTap directory whose index is read (default `TIMETAP_DIR`).
+
+    Raises
+    ------
+    OSError
+        If the index cannot be read or written.
+
+    """
+    key_type = DatabaseDisplayKey.FILETYPE if key_type is None else key_type
+    end_date = datetime.today() if end_date is None else end_date
+
+    # The index stays locked while it's read, so no update can replace
+    # rollups partway through
+    with _index_lock(directory):
+        try:
+            manifest = _updated_index(jobs=jobs, directory=directory)
+            index_dict = _database_dict_from_index(start_date, end_date, key_type, manifest,
+                                                   path_filter, directory)
+        except ValueError:
+            # A rollup the manifest counts on is missing or corrupt
+            manifest = _updated_index(jobs=jobs, rebuild=True, directory=directory)
+            index_dict = _database_dict_from_index(start_date, end_date, key_type, manifest,
+                                                   path_filter, directory)
+
+    for filetitle, seconds in index_dict.items():
+        try:
+            database_dict[filetitle] += seconds
+        except KeyError:
+            database_dict[filetitle] = seconds
+
+
+def _database_dict_from_index(start_date, end_date, key_type, manifest, path_filter=None,
+                              directory=None):
+    # Return a new database dict as `populate_database_dict_from_index`
+    # describes from the up-to-date index with the given manifest, raising
+    # ValueError if a rollup that should exist is missing or corrupt
+    database_dict = {}
+    indexed_days = manifest["days"]
+    if not indexed_days:
+        return database_dict
+
+    if key_type == DatabaseDisplayKey.DATE:
+        for database_filename in existing_database_filenames(start_date, end_date, directory):
+            try:
+                total = indexed_days[database_filename][2]
+            except KeyError:
+                continue
+            if total is None:
+                continue
+            if path_filter is not None:
+                # Only the manifest's totals are unfiltered
+                time_per_path = _load_index_rollup("day", database_filename[:8],
+                                                   indexed_days, directory)
+                accepted_seconds = [seconds for path, seconds in time_per_path.items()
+                                    if path_filter(path)]
+                if not accepted_seconds:
+                    continue
+                total = sum(accepted_seconds)
+            date = _parse_date(database_filename)
+            database_dict[date] = database_dict.get(date, 0) + total
+        return database_dict
+
+    # Only the indexed days can contribute, so the range is clipped to them
+    # rather than covered with rollups that don't exist
+    first_day = datetime.strptime(min(indexed_days)[:8], "%Y%m%d").date()
+    last_day = datetime.strptime(max(indexed_days)[:8], "%Y%m%d").date()
+    pieces = _index_pieces(max(start_date.date(), first_day), min(end_date.date(), last_day))
+    for period in pieces:
+        for path, seconds in _load_index_rollup(*period, indexed_days, directory).items():
+            if path_filter is not None and not path_filter(path):
+                continue
+            filetitle = _parse_key(path, key_type)
+            try:
+                database_dict[filetitle] += seconds
+            except KeyError:
+                database_dict[filetitle] = seconds
+    return database_dict
+
+
+def _index_periods(date):
+    # Return the (kind, key) of every coarse rollup containing the date
+    iso_year, iso_week, _ = date.isocalendar()
+    return [("week", "{}W{:02}".format(iso_year, iso_week)),
+            ("month", date.strftime("%Y%m")),
+            ("year", date.strftime("%Y"))]
+
+
+def _index_pieces(start_date, end_date):
+    # Return the (kind, key) of each rollup in a greedy cover of the range
+    one_day = timedelta(days=1)
+    pieces = []
+    date = start_date
+
+    while date <= end_date:
+        year_end = date.replace(month=12, day=31)
+        # The day before the first of next month
+        month_end = (date.replace(day=28) + timedelta(days=4)).replace(day=1) - one_day
+        week_end = date + timedelta(days=6)
+
+        if date.month == 1 and date.day == 1 and year_end <= end_date:
+            pieces.append(("year", date.strftime("%Y")))
+            date = year_end
+        elif date.day == 1 and month_end <= end_date:
+            pieces.append(("month", date.strftime("%Y%m")))
+            date = month_end
+        elif date.weekday() == 0 and week_end <= end_date:
+            pieces.append(_index_periods(date)[0])
+            date = week_end
+        else:
+            pieces.append(("day", date.strftime("%Y%m%d")))
+        date += one_day
 
-    if args.verbose:
-        _print_filter_and_sort(key_type, regex)
-        print()
-        print("{} entries".format(len(database)))
-        print()
+    return pieces
 
-    print_database(database, start_date, end_date=end_date, tree=tree)
 
+def _index_rollup_filename(kind, key, directory=None):
+    # Return the path of the rollup of the given kind and key
+    return os.path.join(_index_dir(directory), kind, key + ".json")
 
-def _parse_database_display_key(args):
-    # Return a `DatabaseDisplayKey` constant based on `argparse` args
-    if args.dates:
-        return DatabaseDisplayKey.DATE
-    elif args.tree:
-        return DatabaseDisplayKey.TREE
-    elif args.paths:
-        return DatabaseDisplayKey.PATH
-    elif args.names:
-        return DatabaseDisplayKey.FILENAME
 
-    return DatabaseDisplayKey.FILETYPE
+def _index_dir(directory=None):
+    # Return the index directory of a TimeTap directory (or `TIMETAP_DIR`)
+    return INDEX_DIR if directory is None else os.path.join(directory, ".index")
 
 
-def _print_filter_and_sort(key_type, regex):
-    # Print how the data is being filtered and sorted
-    print('{} -> {}'.format(key_type.name, regex))
-    print()
+def _load_index_json(filename):
+    # Return the object stored in an index file or an empty dict if missing
+    import json
 
-    if key_type == DatabaseDisplayKey.DATE:
-        print("sorted from least to most recent date")
-    elif key_type == DatabaseDisplayKey.TREE:
-        print("sorted hierarchically and then alphabetically")
+    try:
+        with open(filename, "r") as index_file:
+            if _run_profile is not None:
+                _run_profile.count("index_files_read")
+            return json.load(index_file)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        # A corrupt file is treated like a missing one
+        return {}
+
+
+def _index_period_filenames(kind, key):
+    # Return the date database filename of every day in a rollup's period
+    if kind == "day":
+        start_date = end_date = datetime.strptime(key, "%Y%m%d")
+    elif kind == "week":
+        # The Monday of the ISO week
+        start_date = datetime.strptime(key + "1", "%GW%V%u")
+        end_date = start_date + timedelta(days=6)
+    elif kind == "month":
+        start_date = datetime.strptime(key, "%Y%m")
+        end_date = (start_date + timedelta(days=31)).replace(day=1) - timedelta(days=1)
     else:
-        print("sorted from max to min time")
+        start_date = datetime.strptime(key, "%Y")
+        end_date = start_date.replace(month=12, day=31)
+    return generated_database_filenames(start_date, end_date)
 
 
-def check_database():
-    """Check for inconsistencies between full database and date databases.
+def _load_index_rollup(kind, key, indexed_days, directory=None):
+    # Return the rollup of the given kind and key, raising ValueError if it
+    # is corrupt or if it is missing although it includes an indexed day
+    import json
 
-    """
-    key_type = DatabaseDisplayKey.PATH
+    filename = _index_rollup_filename(kind, key, directory)
+    try:
+        with open(filename, "r") as index_file:
+            if _run_profile is not None:
+                _run_profile.count("index_files_read")
+            return json.load(index_file)
+    except FileNotFoundError:
+        # A period with no indexed days simply has no rollup
+        if any(day_filename in indexed_days
+               for day_filename in _index_period_filenames(kind, key)):
+            raise ValueError("missing rollup: " + filename)
+        return {}
+
+
+def _dump_index_json(filename, obj):
+    # Atomically replace an index file with the given object
+    import json
+
+    with _replaced_file(filename, "w") as index_file:
+        json.dump(obj, index_file, separators=(",", ":"))
+
+
+@contextmanager
+def _replaced_file(filename, mode):
+    # Yield a file object opened with the given mode ("w" or "wb") for
+    # writing a new version of the file, which replaces it atomically once
+    # the context exits without an error; the temporary file is uniquely
+    # named, so concurrent writers never write into the same one
+    import tempfile
+
+    directory, basename = os.path.split(filename)
+    os.makedirs(directory, exist_ok=True)
+    temp_fd, temp_filename = tempfile.mkstemp(prefix="." + basename + ".", suffix=".tmp",
+                                              dir=directory)
+    try:
+        with open(temp_fd, mode) as temp_file:
+            yield temp_file
+        os.replace(temp_filename, filename)
+    except BaseException:
+        try:
+            os.remove(temp_filename)
+        except OSError:
+            pass
+        raise
 
-    # Get data from all database files of the 'YYYYMMDD.db' variety
-    by_date_time_per_file = {}
-    for filename in os.listdir(TIMETAP_DIR):
-        if filename != "full.db":
-            populate_database_dict(filename, by_date_time_per_file, key_type=key_type)
 
-    # Get data from 'full.db'
-    full_time_per_file = {}
-    populate_database_dict("full.db", full_time_per_file, key_type=key_type)
+def serve():
+    """Answer queries from other invocations until interrupted or terminated.
+
+    Listen on the Unix socket `DAEMON_SOCKET` for the commandline arguments
+    of other invocations of the program and reply with what they would
+    have printed. Parsed databases are kept in memory between queries, and
+    a database is only read again once its modification time or size
+    changes, so repeated queries (e.g., from a status line) are answered
+    without reading any files.
+
+    """
+    import signal
+    import socket
+    import socketserver
+
+    global _database_cache, _database_watcher
 
-    # Combine data
-    joined_per_file = {}
-    for filename, time in by_date_time_per_file.items():
-        # The last elem in the list will be the time for the same file from
-        # `full_time_per_file` (if it exists there)
-        joined_per_file[filename] = [time, 0]
-    for filename, time in full_time_per_file.items():
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
         try:
-            joined_per_file[filename][1] = time
-        except KeyError:
-            # Filename in `full_time_per_file` that was not in
-            # `by_date_time_per_file`
-            joined_per_file[filename] = [0, time]
+            probe.connect(DAEMON_SOCKET)
+        except FileNotFoundError:
+            pass
+        except ConnectionRefusedError:
+            # Left behind by a daemon that didn't exit cleanly
+            os.remove(DAEMON_SOCKET)
+        else:
+            sys.exit("error: a daemon is already listening on " + DAEMON_SOCKET)
 
-    # Find and display differences
-    total_seconds_difference = 0
-    # Where `x` represents (filename, [by_date_time, full_time])
-    inconsistent_entries = filter(lambda x: x[1][0] != x[1][1], joined_per_file.items())
-    for filename, times in sorted(inconsistent_entries, key=lambda x: x[0]):
-        print("{}:".format(filename))
-        print("\t{} vs {} s (date database vs full)".format(*times))
-        total_seconds_difference += abs(times[1] - times[0])
-    print("TOTAL:")
-    print("\t{} s".format(total_seconds_difference))
-    print()
+    _database_cache = {}
+    _database_watcher = DatabaseWatcher()
+    # Only the user should be able to connect to the socket
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(DAEMON_SOCKET, DaemonRequestHandler)
+    finally:
+        os.umask(old_umask)
 
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
 
-def generated_database_filenames(start_date, end_date=None):
-    """Return sorted filenames matching the given date range.
+    # Stopped by `kill`, a service manager, etc., the daemon should still
+    # remove its socket, or every later invocation would try to connect
+    signal.signal(signal.SIGTERM, interrupt)
+
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(DAEMON_SOCKET)
+            _database_watcher.stop()
+            _database_watcher = None
+            _database_cache = None
 
-    Generate TimeTap-style filenames (YYYYMMDD.db) for all dates from
-    `start_date` to `end_date` inclusive in order from filenames representing
-    the earliest data to those representing the latest.
+
+def query_daemon(argv):
+    """Return what the daemon outputs for the given commandline arguments.
 
     Parameters
     ----------
-    start_date : datetime instance
-        The earliest date to generate the TimeTap-style filename for.
-    end_date : datetime instance, optional
-        The latest date to generate the TimeTap-style filename for (default
-        today).
+    argv : list of str
+        The commandline arguments, excluding the program name, whose
+        results the daemon started by `serve` should compute.
 
     Returns
     -------
-    list of str
-        A list of TimeTap-style filenames between `start_date` and
-        `end_date` inclusive or a list containing only the filename of the
-        full database if `start_date` is None.
-
-    Examples
-    --------
-    >>> from datetime import datetime
-    >>> import vimtimetap
-    >>> start_date = datetime(year=2017, month=10, day=29)
-    >>> end_date = datetime(year=2017, month=11, day=2)
-    >>> vimtimetap.generated_database_filenames(start_date, end_date=end_date)
-    ['20171029.db', '20171030.db', '20171031.db', '20171101.db', '20171102.db']
+    (int, str, str) tuple
+        A tuple of the form (STATUS, STDOUT, STDERR), where STATUS is the
+        exit status and STDOUT and STDERR are what would have been printed
+        to standard output and standard error for the given arguments.
+
+    Raises
+    ------
+    OSError
+        If no daemon is listening or it does not reply in time.
+    ValueError
+        If the daemon's reply is malformed.
 
     """
-    if start_date is None:
-        return ["full.db"]
-    elif end_date is not None and end_date < start_date:
-        return []
+    # Without a socket file, no daemon was ever started, which is quicker
+    # to find out than by importing `socket`
+    os.stat(DAEMON_SOCKET)
+
+    import json
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(DAEMON_TIMEOUT)
+        client.connect(DAEMON_SOCKET)
+        client.sendall(json.dumps(argv).encode() + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        for chunk in iter(lambda: client.recv(65536), b""):
+            chunks.append(chunk)
+
+    response = json.loads(b"".join(chunks).decode())
+    return response["status"], response["stdout"], response["stderr"]
+
+
+def _run_captured(argv):
+    # Return (STATUS, STDOUT, STDERR) from running with the given arguments
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+
+    global _daemon_parser
+
+    # The parser's defaults depend on today's date
+    today = datetime.today().date()
+    if _daemon_parser is None or _daemon_parser[0] != today:
+        _daemon_parser = (today, _get_parser())
+    parser = _daemon_parser[1]
+
+    changed = _database_watcher.changes()
+    if changed is None:
+        _database_cache.clear()
+    else:
+        for database_filename in changed:
+            for key_type in DatabaseDisplayKey:
+                _database_cache.pop((database_filename, key_type), None)
+
+    status = 0
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            args = parser.parse_args(argv)
+            if args.serve:
+                parser.error("argument --serve: a daemon is already running")
+            _run(parser, args)
+        except SystemExit as err:
+            if isinstance(err.code, str):
+                print(err.code, file=sys.stderr)
+                status = 1
+            else:
+                status = err.code or 0
+        except Exception:
+            traceback.print_exc()
+            status = 1
+
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+def _cached_database_dict(database_filename, key_type):
+    # Return a database dict for the file, reading it only if it changed
+    stamp = None
+    if _database_watcher is None:
+        try:
+            stat = os.stat(os.path.join(TIMETAP_DIR, database_filename))
+        except OSError:
+            _database_cache.pop((database_filename, key_type), None)
+            return {}
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    # Otherwise, the watcher removes changed files from the cache
 
-    database_filenames = []
-    end_date = datetime.today() if end_date is None else end_date
+    try:
+        cached_stamp, database_dict = _database_cache[(database_filename, key_type)]
+        if cached_stamp == stamp:
+            return database_dict
+    except KeyError:
+        pass
 
-    while not _equal_dates(start_date, end_date):
-        # The files are of the form YYYYMMDD.db, e.g., 20170310.db
-        filename = start_date.strftime("%Y%m%d") + ".db"
-        database_filenames.append(filename)
-        start_date = start_date + timedelta(days=1)
+    database_dict = {}
+    populate_database_dict(database_filename, database_dict, key_type=key_type)
+    _database_cache[(database_filename, key_type)] = (stamp, database_dict)
+    return database_dict
 
-    # Include the file for `end_date`
-    filename = start_date.strftime("%Y%m%d") + ".db"
-    database_filenames.append(filename)
 
-    # This will be in order from earliest date to latest
-    return database_filenames
+def _inotify_watch(directory):
+    # Return an inotify file descriptor watching the directory's files
+    import ctypes
+    import ctypes.util
 
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError, TypeError):
+        raise OSError("inotify is not available")
 
-def populate_database_dict(database_filename, database_dict, key_type=None):
-    """Populate given database dictionary with data from given file.
+    fd = inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
 
-    Add or update mappings of names (e.g., filenames, dates---the exact
-    format is determined by `key_type`) to the number of seconds associated
-    with that name based on data in the file called `database_filename`,
-    which has a format like the following:
+    mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    if inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        errno = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(errno, os.strerror(errno), directory)
 
-    {'/tmp/crontab.t1M3Tp/crontab': {'total': 134}}
-    {'/etc/ssmtp/ssmtp.conf': {'total': 1873}}
-    {'/home/user/.bashrc': {'total': 636}}
+    return fd
 
-    Parameters
-    ----------
-    database_filename : str
-        The name of a file in `TIMETAP_DIR` from which data will be pulled
-        to add to or update `database_dict`.
-    database_dict : dict of str to int
-        A mapping of names (e.g., of filenames, paths, dates, etc.) to the
-        number of seconds associated with each name, which will be updated
-        with new mappings or incremented times.
-    key_type : DatabaseDisplayKey constant, optional
-        A constant that determines what type of key is used in populating
-        the `database_dict` (default DatabaseDisplayKey.FILETYPE).
 
-    """
-    key_type = DatabaseDisplayKey.FILETYPE if key_type is None else key_type
-    timetap_db = os.path.join(TIMETAP_DIR, database_filename)
+@lru_cache(maxsize=None)
+def _compiled_regex(regex):
+    # Return the compiled regex, compiling each distinct regex only once
+    import re
 
-    try:
-        with open(timetap_db, "r") as database:
-            data = database.read().splitlines()
-    except IOError:
-        return
+    return re.compile(regex)
 
-    if key_type == DatabaseDisplayKey.DATE:
-        # This will be the same for all lines in `data`, so it's not worth
-        # recalculating it each iteration
-        file_date = _parse_date(database_filename)
 
-    for line in data:
-        # For lines like "{'/home/user/test.py': {'total': 104}}"
-        # json properties should use double quotes; the lines use single
-        line_dict = json.loads(line.replace("'", '"'))
+def _is_database_filename(filename):
+    # Return True if the filename is that of a TimeTap database
+    return filename == "full.db" or _is_date_database_filename(filename)
 
-        # Only one path key should be in each `line_dict`
-        assert len(line_dict) == 1
-        path = list(line_dict).pop()
-        seconds = line_dict[path]["total"]
 
-        if key_type == DatabaseDisplayKey.DATE:
-            filetitle = file_date
-        elif key_type == DatabaseDisplayKey.PATH or key_type == DatabaseDisplayKey.TREE:
-            filetitle = path
-        elif key_type == DatabaseDisplayKey.FILENAME:
-            filetitle = os.path.basename(path)
-        else:
-            filetitle = _parse_filetype(path)
+def _is_date_database_filename(filename):
+    # Return True if the filename is of the form YYYYMMDD.db
+    return (len(filename) == 11 and filename.endswith(".db") and filename[:8].isascii()
+            and filename[:8].isdigit())
 
-        try:
-            database_dict[filetitle] += seconds
-        except KeyError:
-            database_dict[filetitle] = seconds
 
+def database_columns(database_filename, directory=None):
+    """Return the records of a TimeTap database as columns.
 
-def _parse_date(filename):
-    # Return a %Y %b %d formatted string based on TimeTap database filename
-    try:
-        # `filename` has the form "YYYYMMDD.db"
-        file_year = int(filename[:4])
-        file_month = int(filename[4:6])
-        file_day = int(filename[6:8])
-    except ValueError:
-        # "full.db", the datebase containing all data, is the only TimeTap
-        # database file whose name doesn't follow the "YYYYMMDD.db" format
-        assert filename == "full.db"
-        return "ALL"
+    The columns are read from a binary cache of the database in the index
+    (`BINARY_CACHE_DIR` for `TIMETAP_DIR`), which is memory-mapped so that
+    no records are copied. The cache is rewritten first if the database's
+    modification time or size has changed since it was written. It consists
+    of a header, a column of 64-bit seconds, a column of 32-bit path IDs,
+    and a table of path string offsets followed by the UTF-8 paths
+    themselves. If the cache can't be written, the columns are built in
+    memory instead.
 
-    # These should always be valid
-    file_date = datetime(year=file_year, month=file_month, day=file_day)
-    return file_date.strftime("%Y %b %d")
+    Parameters
+    ----------
+    database_filename : str
+        The name of a file in `directory` whose records will be returned.
+    directory : str, optional
+        The TimeTap directory to read (default `TIMETAP_DIR`).
 
+    Returns
+    -------
+    (list of str, memoryview, memoryview) tuple
+        A tuple of the form (PATHS, PATH_IDS, SECONDS), where PATHS holds
+        each distinct path in order of appearance and PATH_IDS and SECONDS
+        are sequences of unsigned 32-bit and signed 64-bit integers in
+        which each index gives the index into PATHS and number of seconds
+        for a record, in order. All are empty if the database doesn't
+        exist.
 
-def _parse_filetype(path):
-    # Return filetype of filename at end of given path
-    _, extension = os.path.splitext(path)
-    extension = "*" + extension if extension else os.path.basename(path)
-    extension = extension if extension else "OTHER"
-    return extension
+    """
+    timetap_db = _database_path(database_filename, directory)
+    binary_cache_dir = BINARY_CACHE_DIR if directory is None else os.path.join(
+        _index_dir(directory), "binary")
+    cache_filename = os.path.join(binary_cache_dir, database_filename[:-len(".db")] + ".bin")
+
+    try:
+        stat = os.stat(timetap_db)
+    except OSError:
+        return [], memoryview(array("I")), memoryview(array("q"))
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    try:
+        with open(cache_filename, "rb") as cache:
+            cache_map = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+        columns = _mapped_database_columns(cache_map, stamp)
+        if columns is not None:
+            if _run_profile is not None:
+                _run_profile.count("binary_caches_read")
+            return columns
+    except (OSError, ValueError, struct.error):
+        # Missing, truncated, or corrupt: just rewrite it
+        pass
+
+    # Parse the columns with the stamp from before reading, so that a
+    # change made while reading is noticed next time
+    columns = _parsed_database_columns(database_filename, directory)
+    try:
+        _dump_database_columns(cache_filename, stamp, *columns)
+    except OSError:
+        pass
+    return columns[0], memoryview(columns[1]), memoryview(columns[2])
+
+
+def _parsed_database_columns(database_filename, directory=None):
+    # Return (PATHS, PATH_IDS, SECONDS) parsed from the database's text
+    path_ids = {}
+    path_id_column = array("I")
+    seconds_column = array("q")
+    for path, seconds in database_records(database_filename, directory):
+        path_id_column.append(path_ids.setdefault(path, len(path_ids)))
+        seconds_column.append(seconds)
+    return list(path_ids), path_id_column, seconds_column
+
+
+def _mapped_database_columns(cache_map, stamp):
+    # Return (PATHS, PATH_IDS, SECONDS) from a mapped binary cache or None
+    # if it was written for another version or state of its database
+    magic, version, mtime_ns, size, path_count, record_count = \
+        _BINARY_CACHE_HEADER.unpack_from(cache_map)
+    if (magic, version, (mtime_ns, size)) != (b"TTBC", BINARY_CACHE_VERSION, stamp):
+        return None
+
+    view = memoryview(cache_map)
+    offset = _BINARY_CACHE_HEADER.size
+    seconds = view[offset:offset+8*record_count].cast("q")
+    offset += 8 * record_count
+    path_ids = view[offset:offset+4*record_count].cast("I")
+    # Skip padding that keeps the offsets 8-byte aligned
+    offset += 4 * (record_count + record_count % 2)
+    path_ends = view[offset:offset+8*path_count].cast("Q")
+    offset += 8 * path_count
+
+    paths = []
+    start = 0
+    for end in path_ends:
+        paths.append(str(view[offset+start:offset+end], "utf-8", "surrogateescape"))
+        start = end
+    return paths, path_ids, seconds
+
+
+def _dump_database_columns(cache_filename, stamp, paths, path_ids, seconds):
+    # Atomically replace a binary cache with the given columns
+    encoded_paths = [path.encode("utf-8", "surrogateescape") for path in paths]
+    path_ends = array("Q")
+    end = 0
+    for encoded_path in encoded_paths:
+        end += len(encoded_path)
+        path_ends.append(end)
+
+    with _replaced_file(cache_filename, "wb") as cache:
+        cache.write(_BINARY_CACHE_HEADER.pack(b"TTBC", BINARY_CACHE_VERSION, stamp[0], stamp[1],
+                                              len(paths), len(seconds)))
+        # Everything is 8-byte aligned up to the variable-length paths
+        cache.write(seconds.tobytes())
+        cache.write(path_ids.tobytes())
+        if len(path_ids) % 2:
+            cache.write(bytes(4))
+        cache.write(path_ends.tobytes())
+        cache.write(b"".join(encoded_paths))
+
+
+def _time_per_path_from_columns(paths, path_ids, seconds):
+    # Return a dict of paths to total seconds from database columns
+    totals = [0] * len(paths)
+    for path_id, record_seconds in zip(path_ids, seconds):
+        totals[path_id] += record_seconds
+    return dict(zip(paths, totals))
 
 
 def filter_database_dict(database_dict, regex):
@@ -349,7 +3218,7 @@ def filter_database_dict(database_dict, regex):
         remain in `database_dict`.
 
     """
-    regex_engine = re.compile(regex)
+    regex_engine = _compiled_regex(regex)
     filetitles_to_delete = []
 
     for filetitle in database_dict:
@@ -360,7 +3229,52 @@ def filter_database_dict(database_dict, regex):
         del database_dict[filetitle]
 
 
-def print_database(database, start_date, end_date=None, tree=False):
+def ranked_database_items(database_dict, top=None, min_seconds=None):
+    """Return the items of a database dict from most to least time.
+
+    With `top` or `min_seconds`, only the items with the most time are
+    ranked, which is done with a bounded heap rather than by sorting every
+    item, and the seconds of every other item are summed in a final item
+    whose key is "OTHER" so that the sum of all the items is unchanged.
+
+    Parameters
+    ----------
+    database_dict : dict of str to int
+        A mapping of names (e.g., of filenames or paths) to the number of
+        seconds associated with each name.
+    top : int, optional
+        If given, at most this many items are ranked (default None).
+    min_seconds : int, optional
+        If given, items with fewer seconds are not ranked (default None).
+
+    Returns
+    -------
+    list of (str, int) tuple
+        The ranked items, in order from most to least time, and then the
+        "OTHER" item if any items weren't ranked.
+
+    """
+    import heapq
+
+    items = database_dict.items()
+    if min_seconds is not None:
+        items = ((key, seconds) for key, seconds in items if seconds >= min_seconds)
+    if top is None:
+        ranked_items = sorted(items, key=lambda tup: tup[1], reverse=True)
+    else:
+        ranked_items = heapq.nlargest(top, items, key=lambda tup: tup[1])
+
+    if len(ranked_items) < len(database_dict):
+        # A key that is already "OTHER" (the type of a file without an
+        # extension) goes in with the rest rather than being listed twice
+        ranked_items = [(key, seconds) for key, seconds in ranked_items if key != "OTHER"]
+        other_seconds = sum(database_dict.values()) - sum(seconds for _, seconds in ranked_items)
+        ranked_items.append(("OTHER", other_seconds))
+    return ranked_items
+
+
+def print_database(database, start_date, end_date=None, tree=False, max_depth=None,
+                   min_seconds=None):
     """Print database in sequential order with a title and sum.
 
     Print the number of hours, minutes, and seconds associated with each
@@ -384,10 +3298,18 @@ def print_database(database, start_date, end_date=None, tree=False):
         True if the database should be printed in tree order (which assumes
         the keys in `database` are paths), and False if they should be
         printed in the order given without any hierarchy (default False).
+    max_depth : int, optional
+        If given with `tree`, the number of levels below the root directory
+        beyond which entries are summed into their ancestors rather than
+        printed (default None).
+    min_seconds : int, optional
+        If given with `tree`, entries with fewer seconds (and everything
+        below them) are left out (default None).
 
     """
     if tree:
-        _print_database_as_tree(database, start_date, end_date=end_date)
+        _print_database_as_tree(database, start_date, end_date=end_date, max_depth=max_depth,
+                                min_seconds=min_seconds)
         return
 
     title = _get_title(start_date, end_date)
@@ -426,6 +3348,253 @@ def print_database(database, start_date, end_date=None, tree=False):
     print()
 
 
+def print_series(labels, keys, rows, start_date, end_date=None):
+    """Print a series as a table with a row per bucket and a column per key.
+
+    Parameters
+    ----------
+    labels : list of str
+        The label of each bucket.
+    keys : list of str
+        The key of each column.
+    rows : list of list of int
+        The number of seconds of each key for each bucket.
+    start_date : datetime instance
+        The earliest date covered by the series, which is used in creating
+        the title printed.
+    end_date : datetime instance, optional
+        The latest date covered by the series, which is used in creating the
+        title printed (default today).
+
+    """
+    title = _get_title(start_date, end_date)
+    foottype = "SUM"
+
+    totals = [sum(column) for column in zip(*rows)] if rows else [0] * len(keys)
+    cells = [["{}h {:02}m {:02}s".format(*_seconds_to_hms(seconds))
+              for seconds in row + [sum(row)]] for row in rows + [totals]]
+    headers = keys + [foottype]
+    label_width = max([len(label) for label in labels] + [len(foottype)])
+    column_widths = [max([len(header)] + [len(row[column]) for row in cells])
+                     for column, header in enumerate(headers)]
+    text_width = max(len(title), label_width + sum(width + 2 for width in column_widths))
+
+    if (text_width - len(title)) % 2:
+        # Increase width so title can be truly centered
+        text_width += 1
+
+    def print_row(label, row):
+        entry = "{:>{width}}".format(label, width=label_width)
+        for cell, width in zip(row, column_widths):
+            entry += "  {:>{width}}".format(cell, width=width)
+        print("{:>{width}}".format(entry, width=text_width))
+
+    print("{:^{width}}".format(title, width=text_width))
+    print("=" * text_width)
+    print_row("", headers)
+    for label, row in zip(labels, cells):
+        print_row(label, row)
+    print("-" * text_width)
+    print_row(foottype, cells[-1])
+    print()
+
+
+def write_series(labels, keys, rows, start_date, end_date=None, output_format="jsonl",
+                 stream=None):
+    """Write a series in a machine-readable format.
+
+    The parameters are as for `print_series` and `write_views`, except that
+    "csv" gives a table like that of `print_series` (with times in seconds
+    and without sums), and the other formats give a row per bucket and key.
+
+    """
+    import csv
+    import json
+
+    stream = sys.stdout if stream is None else stream
+    end_date = datetime.today() if end_date is None else end_date
+    cells = ((label, key, seconds) for label, row in zip(labels, rows)
+             for key, seconds in zip(keys, row) if seconds)
+
+    if output_format == "json":
+        start = None if start_date is None else start_date.strftime("%Y-%m-%d")
+        json.dump({"start": start, "end": end_date.strftime("%Y-%m-%d"), "keys": keys,
+                   "series": [{"bucket": label, "seconds": row}
+                              for label, row in zip(labels, rows)]}, stream)
+        stream.write("\n")
+    elif output_format == "jsonl":
+        for label, key, seconds in cells:
+            stream.write(json.dumps({"bucket": label, "key": key, "seconds": seconds}) + "\n")
+    elif output_format == "csv":
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(["bucket"] + keys)
+        for label, row in zip(labels, rows):
+            writer.writerow([label] + row)
+    elif output_format == "prometheus":
+        stream.write("# HELP vimtimetap_series_seconds Time recorded by Vim TimeTap per bucket.\n")
+        stream.write("# TYPE vimtimetap_series_seconds gauge\n")
+        for label, key, seconds in cells:
+            stream.write('vimtimetap_series_seconds{{bucket="{}",key="{}"}} {}\n'.format(
+                label, _prometheus_label_value(key), seconds))
+    else:
+        raise ValueError("unknown output format: {!r}".format(output_format))
+
+
+def write_views(views, key_types, start_date, end_date=None, output_format="jsonl", regex=None,
+                max_depth=None, min_seconds=None, top=None, stream=None, sources=None,
+                windows=None):
+    """Write views of the database in a machine-readable format.
+
+    Rows are written as they are produced, without first measuring the
+    database as `print_database` does. Each row has a view name (as used by
+    `--views`), a key, and a number of seconds. Keys of the date view are
+    dates of the form YYYY-MM-DD (or "ALL" for the full database), and keys
+    of the tree view are the paths of every directory and file in the tree,
+    in tree order, each with the total time below it.
+
+    Parameters
+    ----------
+    views : dict of DatabaseDisplayKey constant to dict of str to int
+        A mapping like that returned by `database_views`. The dicts of views
+        other than the date view may be filtered in place.
+    key_types : list of DatabaseDisplayKey constant
+        The views to write in the order given.
+    start_date : datetime instance
+        The earliest date covered by `views` or None if they cover all data.
+    end_date : datetime instance, optional
+        The latest date covered by `views` (default today).
+    output_format : str, optional
+        One of "json" (a single document), "jsonl" (a JSON object per
+        line), "csv" (with a header), or "prometheus" (the Prometheus text
+        exposition format) (default "jsonl").
+    regex : str, optional
+        If given, only keys it matches are written, as with
+        `filter_database_dict` (default None).
+    max_depth : int, optional
+        As for `print_database`, but for the tree view only (default None).
+    min_seconds : int, optional
+        As for `print_database` for the tree view and as for
+        `ranked_database_items` for views other than the date view (default
+        None).
+    top : int, optional
+        As for `ranked_database_items`, but for views other than the date
+        and tree views only (default None).
+    stream : file object, optional
+        Where the rows are written (default `sys.stdout`).
+    sources : list of str, optional
+        If given, `views` is instead a list of mappings like that returned
+        by `database_views`, one for each source named in `sources`, and
+        each row also has the name of its source (default None).
+    windows : list of (datetime instance, datetime instance) tuple, optional
+        If given (and `sources` isn't), `views` is instead a list of mappings
+        like that returned by `windowed_database_views`, one for each range
+        in `windows`, and each row also has its range as "START/END", both
+        of the form YYYY-MM-DD (default None).
+
+    """
+    import csv
+    import json
+
+    stream = sys.stdout if stream is None else stream
+    end_date = datetime.today() if end_date is None else end_date
+    view_names = {key_type: name for name, key_type in VIEW_NAMES.items()}
+    if sources is not None:
+        group_name, source_views = "source", list(zip(sources, views))
+    elif windows is not None:
+        group_name = "window"
+        source_views = [("{}/{}".format(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+                         window_views) for (start, end), window_views in zip(windows, views)]
+    else:
+        group_name, source_views = None, [(None, views)]
+    # Rows are (SOURCE, KEY, SECONDS) tuples, where SOURCE (the source or
+    # range) is only written if `sources` or `windows` is given
+    view_rows = ((view_names[key_type], _source_view_rows(source_views, key_type, regex=regex,
+                                                          max_depth=max_depth,
+                                                          min_seconds=min_seconds, top=top))
+                 for key_type in key_types)
+
+    def row_fields(source, key, seconds):
+        # Return the fields of a row other than its view as a dict
+        if group_name is None:
+            return {"key": key, "seconds": seconds}
+        return {group_name: source, "key": key, "seconds": seconds}
+
+    if output_format == "json":
+        start = None if start_date is None else start_date.strftime("%Y-%m-%d")
+        stream.write('{{"start": {}, "end": {}, "views": {{'.format(
+            json.dumps(start), json.dumps(end_date.strftime("%Y-%m-%d"))))
+        for view_number, (view, rows) in enumerate(view_rows):
+            stream.write("{}{}: [".format(", " if view_number else "", json.dumps(view)))
+            for row_number, row in enumerate(rows):
+                stream.write("{}\n{}".format("," if row_number else "",
+                                             json.dumps(row_fields(*row))))
+            stream.write("]")
+        stream.write("}}\n")
+    elif output_format == "jsonl":
+        for view, rows in view_rows:
+            for row in rows:
+                fields = {"view": view}
+                fields.update(row_fields(*row))
+                stream.write(json.dumps(fields) + "\n")
+    elif output_format == "csv":
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(["view"] + list(row_fields(None, None, None)))
+        for view, rows in view_rows:
+            writer.writerows([view] + list(row_fields(*row).values()) for row in rows)
+    elif output_format == "prometheus":
+        stream.write("# HELP vimtimetap_seconds Time recorded by Vim TimeTap.\n")
+        stream.write("# TYPE vimtimetap_seconds gauge\n")
+        for view, rows in view_rows:
+            for row in rows:
+                fields = row_fields(*row)
+                seconds = fields.pop("seconds")
+                labels = "".join(',{}="{}"'.format(name, _prometheus_label_value(value))
+                                 for name, value in fields.items())
+                stream.write('vimtimetap_seconds{{view="{}"{}}} {}\n'.format(view, labels,
+                                                                           seconds))
+    else:
+        raise ValueError("unknown output format: {!r}".format(output_format))
+
+
+def _source_view_rows(source_views, key_type, regex=None, max_depth=None, min_seconds=None,
+                      top=None):
+    # Yield the (SOURCE, KEY, SECONDS) rows of one view for each source
+    for source, views in source_views:
+        for key, seconds in _view_rows(views[key_type], key_type, regex=regex,
+                                       max_depth=max_depth, min_seconds=min_seconds, top=top):
+            yield source, key, seconds
+
+
+def _view_rows(time_per_type, key_type, regex=None, max_depth=None, min_seconds=None,
+               top=None):
+    # Yield the (KEY, SECONDS) rows of one view in the order they're printed
+    if key_type == DatabaseDisplayKey.DATE:
+        # As with text, dates are not affected by the filter
+        for date, seconds in time_per_type.items():
+            if date != "ALL":
+                date = datetime.strptime(date, "%Y %b %d").strftime("%Y-%m-%d")
+            yield date, seconds
+        return
+
+    if regex is not None:
+        filter_database_dict(time_per_type, regex)
+
+    if key_type == DatabaseDisplayKey.TREE:
+        path_trie = _database_trie(time_per_type.items(), max_depth=max_depth)
+        directories = []
+        for depth, directory, node in _walked_database_trie(path_trie, min_seconds):
+            del directories[depth:]
+            directories.append(directory)
+            yield os.path.join(*directories), node.value
+    else:
+        yield from ranked_database_items(time_per_type, top=top, min_seconds=min_seconds)
+
+
+def _prometheus_label_value(value):
+    # Escape a string for use as a Prometheus label value
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
 def _get_title(start_date, end_date=None):
     # Return string title based on given days to include up to end date
     if start_date is None:
@@ -463,69 +3632,118 @@ def _seconds_to_hms(seconds):
 
 def _equal_dates(date1, date2):
     # Return True if dates equal based on years, months, and days of month
-    return date1.strftime("%x") == date2.strftime("%x")
+    return (date1.year, date1.month, date1.day) == (date2.year, date2.month, date2.day)
 
 
-def _print_database_as_tree(database, start_date, end_date=None):
+def _print_database_as_tree(database, start_date, end_date=None, max_depth=None,
+                            min_seconds=None):
     # Print database in tree order.
-    path_trie = TrieNode(0)
+    path_trie = _database_trie(database, max_depth=max_depth)
+
+    title = _get_title(start_date, end_date)
+    print(title)
+    print()
+
+    printed = False
+    for entry in _database_tree_entries(path_trie, min_seconds=min_seconds):
+        print(entry)
+        printed = True
+    if not printed:
+        print("0h 00m 00s /")
+
+    print()
+
+
+def _database_trie(database, max_depth=None):
+    # Return a trie of the directories/files along the paths in database
+    path_trie = TrieNode(0, {})
+    intern = sys.intern
 
     # Assumes the database contains paths, not file types or filenames
     for file_path, raw_seconds in database:
         node = path_trie
         node.value += raw_seconds
-        for directory in _directories_in_path(file_path):
+        directories = _directories_in_path(file_path)
+        truncated = max_depth is not None and len(directories) > max_depth + 1
+        if truncated:
+            # Times deeper than this are still summed into the last node
+            del directories[max_depth + 1:]
+        for directory in directories:
+            if node.goto is None:
+                node.goto = {}
             try:
                 node = node.goto[directory]
                 node.value += raw_seconds
             except KeyError:
-                node.goto[directory] = TrieNode(raw_seconds)
-                node = node.goto[directory]
-
-    tree_entries = []
-    _populate_database_tree_entries(path_trie, tree_entries)
-
-    title = _get_title(start_date, end_date)
-    print(title)
-    print()
-
-    if not tree_entries:
-        tree_entries.append("0h 00m 00s /")
-    for entry in tree_entries:
-        print(entry)
+                # Interning shares the strings for names repeated across
+                # directories (e.g., "src")
+                child = node.goto[intern(directory)] = TrieNode(raw_seconds)
+                node = child
+        if truncated and node.goto is None:
+            # Still a directory even though its contents aren't shown
+            node.goto = {}
 
-    print()
+    return path_trie
 
 
-def _populate_database_tree_entries(database_trie, entries, indent=0, time_width=0):
-    # Populate entries with formatted strings derived from database_trie
-    tab_width = 2
-    # The band of characters connecting times to directories/filenames
-    leader = "- " * (indent // 2)
+def _database_tree_entries(database_trie, min_seconds=None):
+    # Yield formatted strings derived from database_trie in tree order
+    time_width = 0
 
-    if not database_trie.goto:
-        return
-    for directory in sorted(database_trie.goto):
-        seconds = database_trie.goto[directory].value
-        time = "{}h {:02}m {:02}s ".format(*_seconds_to_hms(seconds))
+    for depth, directory, node in _walked_database_trie(database_trie, min_seconds):
+        # The band of characters connecting times to directories/filenames
+        time = "{}h {:02}m {:02}s ".format(*_seconds_to_hms(node.value))
         # Set `time_width` based on root, which has longest `len(time)`
         # since it's the overall sum
         if time_width == 0:
             time_width = len(time)
-        entry = " " * (time_width - len(time))
-        entry += time
-        entry += leader
-        entry += directory
+        entry = " " * (time_width - len(time)) + time + "- " * depth + directory
         # Append '/' to directories (aside from root)
-        if database_trie.goto[directory].goto and indent:
+        if node.goto is not None and depth:
             entry += "/"
-        entries.append(entry)
-        _populate_database_tree_entries(database_trie.goto[directory], entries,
-                                        indent=indent+tab_width, time_width=time_width)
+        yield entry
+
+
+def _walked_database_trie(database_trie, min_seconds=None):
+    # Yield (DEPTH, NAME, NODE) tuples for the nodes below database_trie
+    # in tree order, leaving out those with fewer than min_seconds
+    min_seconds = 0 if min_seconds is None else min_seconds
+
+    # Walk the trie depth first with a stack of iterators over sorted
+    # children rather than recursing, which deep paths could overflow
+    stack = [_sorted_tree_children(database_trie, min_seconds)]
+    while stack:
+        try:
+            directory, node = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+
+        yield len(stack) - 1, directory, node
+
+        if node.goto:
+            stack.append(_sorted_tree_children(node, min_seconds))
+
+
+def _sorted_tree_children(node, min_seconds):
+    # Return an iterator of (NAME, NODE) tuples of the children of node
+    # with at least min_seconds, in order by name
+    if node.goto is None:
+        return iter(())
+    return iter(sorted((directory, child) for directory, child in node.goto.items()
+                       if child.value >= min_seconds))
 
 
 def _directories_in_path(path):
-    # Return an iterator of directories/file along a given path
+    # Return a list of directories/file along a given path
+    sep = os.sep
+    if path.startswith(sep) and not path.endswith(sep) and sep + sep not in path:
+        # The usual absolute path needs only one split (and gives what the
+        # loop below would)
+        directories = path.split(sep)
+        directories[0] = sep
+        return directories
+
     directories = []
     head, tail = os.path.split(path)
 
@@ -539,11 +3757,14 @@ def _directories_in_path(path):
     directories.append(head)
 
     # Return directories in order from closest to root to farthest
-    return reversed(directories)
+    directories.reverse()
+    return directories
 
 
 def _get_parser():
     # Return the commandline argument parser for the application
+    import argparse
+
     parser = argparse.ArgumentParser(description="Display summaries for Vim TimeTap.")
 
     parser.add_argument("units_past", metavar="UNITS", nargs="?", type=int, default=1,
@@ -564,6 +3785,20 @@ def _get_parser():
     parser.add_argument("-D", "--end-day", metavar="DAY", type=int, default=today.day,
                         help="specify the end day of month instead of using the current day")
 
+    # For specifying an explicit or calendar-aligned range
+    parser.add_argument("--from", dest="from_date", metavar="DATE", type=_parse_date_argument,
+                        help="start the range on DATE (YYYY-MM-DD) instead of counting UNITS "
+                             "back from the end date")
+    parser.add_argument("--to", dest="to_date", metavar="DATE", type=_parse_date_argument,
+                        help="end the range on DATE (YYYY-MM-DD) instead of the end date set "
+                             "by the options above")
+    parser.add_argument("--period", choices=CALENDAR_PERIODS, metavar="PERIOD",
+                        help="change the time unit to calendar weeks (from Monday), months, "
+                             "quarters, or years, so the range starts at the beginning of one")
+    parser.add_argument("--compare", action="store_true",
+                        help="summarize each unit (or period) of the range separately, reading "
+                             "each database only once")
+
     # For changing the time unit from days
     unit_size_group = parser.add_mutually_exclusive_group()
     unit_size_group.add_argument("-y", "--years", action="store_const", const=365, default=0,
@@ -583,16 +3818,73 @@ def _get_parser():
                                help="display full path instead of file types")
     display_group.add_argument("-t", "--tree", action="store_true",
                                help="display path tree instead of file types")
+    display_group.add_argument("--views", metavar="VIEWS", type=_parse_views,
+                               help="display each of a comma-separated list of views (e.g., "
+                                    "'dates,names,types') from a single read of the data")
+
+    parser.add_argument("--series", choices=SERIES_BUCKETS, metavar="BUCKET",
+                        help="display a table of the time per file type (or name or path) in "
+                             "each day, week, month, or quarter")
+    parser.add_argument("--top", metavar="N", type=int,
+                        help="display only the N entries (or, with --series, keys) with the "
+                             "most time, summing the rest as OTHER (default with --series: "
+                             "{})".format(SERIES_DEFAULT_TOP))
 
     # For changing what data is included
+    parser.add_argument("--depth", metavar="N", type=int,
+                        help="with --tree, display at most N levels below the root")
+    parser.add_argument("--min-time", metavar="DURATION", type=_parse_duration,
+                        help="leave out entries with less time than DURATION (e.g., '90', "
+                             "'45m', or '1h30m'), summing them as OTHER unless displaying a "
+                             "tree")
     parser.add_argument("-f", "--filter", metavar="REGEX",
                         help="filter entries according to the provided regex")
+    parser.add_argument("--include-path", metavar="REGEX", action="append",
+                        help="include only paths matching this (or any other such) regex")
+    parser.add_argument("--exclude-path", metavar="REGEX", action="append",
+                        help="leave out paths matching this regex (can be repeated)")
+
+    # For reading other TimeTap directories
+    parser.add_argument("--source", metavar="DIR", action="append",
+                        help="read this TimeTap directory (or those matching this glob) "
+                             "instead of ~/.timetap, summing over all given (can be repeated)")
+    parser.add_argument("--by-source", action="store_true",
+                        help="with --source, display each directory separately")
 
     # other
     parser.add_argument("-v", "--verbose", action="store_true",
                         help="display filter and sort information")
     parser.add_argument("-c", "--check", action="store_true",
                         help="check for inconsistencies in the databases then exit")
+    parser.add_argument("--repair", action="store_true",
+                        help="rebuild the full database from the date databases then exit")
+    parser.add_argument("--compact", action="store_true",
+                        help="merge repeated paths within date databases then exit")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text",
+                        help="print views (or --check, --repair, and --compact reports) as "
+                             "text or in a machine-readable format (default: text)")
+    parser.add_argument("-j", "--jobs", metavar="N", type=int,
+                        help="number of processes reading databases (default: CPU count "
+                             "for long ranges)")
+    parser.add_argument("--serve", action="store_true",
+                        help="keep data in memory and answer other invocations until "
+                             "interrupted")
+    parser.add_argument("--daemon-status", action="store_true",
+                        help="print how quickly the daemon has noticed changes then exit")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="compute results here even if a daemon is running")
+    parser.add_argument("--backend", choices=("python", "numpy"), default="python",
+                        help="sum the data with plain Python or with NumPy arrays "
+                             "(default: python)")
+    parser.add_argument("--no-index", action="store_true",
+                        help="read the date databases directly instead of the rollup index")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time, files read, and memory use of each stage to "
+                             "standard error (without the daemon)")
+    parser.add_argument("--profile-format", choices=("text", "json"), default="text",
+                        help="print the --profile report as text or JSON (default: text)")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="save cProfile statistics of the run to FILE (without the daemon)")
 
     return parser
 